@@ -7,6 +7,7 @@ from .models import (
     BloodRequest, BloodCamp, BloodStock,
     Notification, AIPredictionLog, ContactMessage, GlobalSetting,
     DonorAnalytics, HospitalAnalytics, ChatbotConversation, PasswordResetToken,
+    DailyBloodDemand, PincodeLocation, NotificationJob,
 )
 
 # ============================================================================ #
@@ -35,10 +36,9 @@ def export_analytics(modeladmin, request, queryset):
 def run_ai_predictions(modeladmin, request, queryset):
     """Admin action to run AI predictions."""
     from . import services
-    for item in queryset:
-        # Example: Run demand prediction for hospitals
-        if hasattr(item, 'hospitalprofile'):
-            services.predict_blood_demand_advanced(item)
+    # Run demand prediction for the selected hospitals in one batch
+    hospitals = [item for item in queryset if hasattr(item, 'hospitalprofile')]
+    services.forecast_all_hospitals(hospitals=hospitals, workers=1)
     modeladmin.message_user(request, f'AI predictions run for {queryset.count()} items.')
 
 # ============================================================================ #
@@ -74,14 +74,14 @@ class UserProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'blood_group', 'city', 'state', 'is_available', 'profile_completion_score', 'last_donation_date')
     list_filter = ('gender', 'blood_group', 'state', 'is_available')
     search_fields = ('user__email', 'user__username', 'contact_number', 'city')
-    readonly_fields = ('profile_completion_score', 'total_donations', 'engagement_score')
+    readonly_fields = ('profile_completion_score', 'total_donations', 'engagement_score', 'latitude', 'longitude')
     
     fieldsets = (
         ('Personal Information', {
             'fields': ('user', 'gender', 'date_of_birth', 'weight', 'blood_group')
         }),
         ('Contact Information', {
-            'fields': ('contact_number', 'address', 'city', 'state', 'pincode')
+            'fields': ('contact_number', 'address', 'city', 'state', 'pincode', 'latitude', 'longitude')
         }),
         ('Profile Settings', {
             'fields': ('profile_photo', 'is_available', 'availability_radius')
@@ -102,7 +102,7 @@ class HospitalProfileAdmin(admin.ModelAdmin):
     list_display = ('hospital_name', 'user', 'city', 'state', 'is_verified', 'verification_status')
     list_filter = ('is_verified', 'state', 'city')
     search_fields = ('hospital_name', 'hospital_reg_id', 'user__email', 'city')
-    readonly_fields = ('user', 'total_blood_requests', 'fulfillment_rate')
+    readonly_fields = ('user', 'total_blood_requests', 'fulfillment_rate', 'latitude', 'longitude')
     actions = [make_verified]
     
     fieldsets = (
@@ -113,7 +113,7 @@ class HospitalProfileAdmin(admin.ModelAdmin):
             'fields': ('hospital_name', 'hospital_reg_id', 'hospital_logo', 'website')
         }),
         ('Contact Information', {
-            'fields': ('address', 'city', 'state', 'pincode', 'contact_number')
+            'fields': ('address', 'city', 'state', 'pincode', 'contact_number', 'latitude', 'longitude')
         }),
         ('Verification & Analytics', {
             'fields': ('is_verified', 'total_blood_requests', 'fulfillment_rate', 'avg_response_time')
@@ -141,7 +141,7 @@ class DonationAdmin(admin.ModelAdmin):
     
     fieldsets = (
         ('Donation Information', {
-            'fields': ('donor', 'hospital_name', 'location', 'donation_date', 'units', 'status')
+            'fields': ('donor', 'hospital', 'hospital_name', 'location', 'donation_date', 'units', 'status')
         }),
         ('Donor Health Information', {
             'fields': ('age', 'weight', 'has_disease')
@@ -253,7 +253,8 @@ class DonorAnalyticsAdmin(admin.ModelAdmin):
     list_display = ('donor', 'engagement_score', 'response_rate', 'retention_risk_score', 'last_updated')
     list_filter = ('last_updated',)
     search_fields = ('donor__username', 'donor__email')
-    readonly_fields = ('last_updated',)
+    readonly_fields = ('last_updated', 'completed_donations', 'first_donation_date', 'last_donation_date',
+                       'responses_90d', 'responses_180d', 'features_updated_at', 'retention_scored_at')
     
     fieldsets = (
         ('Donor Information', {
@@ -266,7 +267,11 @@ class DonorAnalyticsAdmin(admin.ModelAdmin):
             'fields': ('last_activity', 'total_notifications', 'notifications_read', 'profile_views')
         }),
         ('Risk Analysis', {
-            'fields': ('retention_risk_score', 'churn_probability')
+            'fields': ('retention_risk_score', 'churn_probability', 'retention_scored_at')
+        }),
+        ('Donation Features', {
+            'fields': ('completed_donations', 'first_donation_date', 'last_donation_date',
+                       'responses_90d', 'responses_180d', 'features_updated_at')
         }),
         ('System Information', {
             'fields': ('last_updated',)
@@ -278,14 +283,21 @@ class HospitalAnalyticsAdmin(admin.ModelAdmin):
     list_display = ('hospital', 'fulfillment_rate', 'total_requests', 'total_donors_engaged', 'last_updated')
     list_filter = ('last_updated',)
     search_fields = ('hospital__hospitalprofile__hospital_name',)
-    readonly_fields = ('last_updated', 'blood_group_stats')
+    # Counters are maintained with F() updates; editing them here would overwrite concurrent changes
+    readonly_fields = (
+        'last_updated', 'blood_group_stats', 'total_requests', 'active_requests', 'fulfilled_requests',
+        'pending_donations', 'confirmed_donations', 'confirmed_units'
+    )
     
     fieldsets = (
         ('Hospital Information', {
             'fields': ('hospital',)
         }),
         ('Performance Metrics', {
-            'fields': ('total_requests', 'fulfilled_requests', 'fulfillment_rate', 'avg_response_time')
+            'fields': ('total_requests', 'active_requests', 'fulfilled_requests', 'fulfillment_rate', 'avg_response_time')
+        }),
+        ('Donations', {
+            'fields': ('pending_donations', 'confirmed_donations', 'confirmed_units')
         }),
         ('Donor Engagement', {
             'fields': ('total_donors_engaged', 'donor_satisfaction_score')
@@ -298,6 +310,23 @@ class HospitalAnalyticsAdmin(admin.ModelAdmin):
         }),
     )
 
+@admin.register(DailyBloodDemand)
+class DailyBloodDemandAdmin(admin.ModelAdmin):
+    list_display = ('hospital', 'blood_group', 'date', 'units_required', 'request_count')
+    list_filter = ('blood_group', 'date')
+    search_fields = ('hospital__hospitalprofile__hospital_name',)
+    readonly_fields = ('hospital', 'blood_group', 'date', 'units_required', 'request_count')
+    date_hierarchy = 'date'
+    
+    def has_add_permission(self, request):
+        return False
+
+@admin.register(PincodeLocation)
+class PincodeLocationAdmin(admin.ModelAdmin):
+    list_display = ('pincode', 'city', 'state', 'latitude', 'longitude')
+    list_filter = ('state',)
+    search_fields = ('pincode', 'city')
+
 @admin.register(AIPredictionLog)
 class AIPredictionLogAdmin(admin.ModelAdmin):
     list_display = ('prediction_type', 'target_user', 'confidence_score', 'timestamp')
@@ -305,6 +334,9 @@ class AIPredictionLogAdmin(admin.ModelAdmin):
     search_fields = ('target_user__username', 'target_user__email')
     readonly_fields = ('prediction_type', 'target_user', 'input_data', 'output_data', 'timestamp', 'confidence_score')
     actions = [run_ai_predictions]
+    # Large append-only table: skip the unfiltered COUNT(*) and join the user in the list query
+    list_select_related = ('target_user',)
+    show_full_result_count = False
     
     fieldsets = (
         ('Prediction Information', {
@@ -327,6 +359,8 @@ class ChatbotConversationAdmin(admin.ModelAdmin):
     list_filter = ('intent_detected', 'created_at')
     search_fields = ('user__username', 'user_message', 'bot_response')
     readonly_fields = ('created_at',)
+    list_select_related = ('user',)
+    show_full_result_count = False
     
     fieldsets = (
         ('Conversation Information', {
@@ -354,11 +388,20 @@ class NotificationAdmin(admin.ModelAdmin):
     search_fields = ('recipient__username', 'message')
     readonly_fields = ('created_at',)
     list_editable = ('is_read',)
+    list_select_related = ('recipient',)
+    show_full_result_count = False
     
     def short_message(self, obj):
         return obj.message[:50] + '...' if len(obj.message) > 50 else obj.message
     short_message.short_description = 'Message'
 
+@admin.register(NotificationJob)
+class NotificationJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'blood_request', 'wave', 'status', 'attempts', 'donors_notified', 'run_after', 'finished_at')
+    list_filter = ('status', 'wave', 'created_at')
+    search_fields = ('blood_request__id',)
+    readonly_fields = ('created_at', 'started_at', 'finished_at', 'donors_matched', 'donors_notified', 'error')
+
 @admin.register(ContactMessage)
 class ContactMessageAdmin(admin.ModelAdmin):
     list_display = ('name', 'email', 'subject', 'submitted_at', 'is_resolved', 'short_message')
@@ -417,9 +460,9 @@ class HemoVitalAdminSite(admin.AdminSite):
                 model_ordering = [
                     'CustomUser', 'UserProfile', 'HospitalProfile',
                     'BloodRequest', 'Donation', 'BloodCamp', 'BloodStock',
-                    'DonorAnalytics', 'HospitalAnalytics', 'AIPredictionLog',
-                    'Notification', 'ChatbotConversation', 'ContactMessage',
-                    'Badge', 'UserBadge', 'Certificate', 'GlobalSetting'
+                    'DonorAnalytics', 'HospitalAnalytics', 'DailyBloodDemand', 'AIPredictionLog',
+                    'Notification', 'NotificationJob', 'ChatbotConversation', 'ContactMessage',
+                    'Badge', 'UserBadge', 'Certificate', 'PincodeLocation', 'GlobalSetting'
                 ]
                 
                 ordered_models = []
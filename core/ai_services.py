@@ -6,8 +6,7 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from django.db.models import Count, Sum, Avg, Q
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import StandardScaler
+from django.db.models.functions import TruncDate
 import joblib
 import os
 from django.utils import timezone
@@ -18,6 +17,10 @@ from .models import (
     BloodRequest, BloodStock, AIPredictionLog, DonorAnalytics,
     HospitalAnalytics, GlobalSetting
 )
+from .forecasting import (
+    predict_using_linear_regression, predict_using_moving_average,
+    predict_using_seasonal_patterns, calculate_prediction_confidence
+)
 
 # ============================================================================ #
 # 1. BLOOD COMPATIBILITY SERVICE
@@ -373,22 +376,30 @@ def get_historical_blood_data(hospital, days=90):
     end_date = timezone.now().date()
     start_date = end_date - timedelta(days=days)
     
-    historical_requests = BloodRequest.objects.filter(
+    # One GROUP BY (blood_group, date) query, zero-filled in memory
+    daily_totals = BloodRequest.objects.filter(
         hospital=hospital,
         created_at__date__range=[start_date, end_date]
-    )
+    ).annotate(
+        day=TruncDate('created_at')
+    ).values('blood_group', 'day').annotate(total=Sum('units_required'))
+    
+    blood_group_index = {code: index for index, (code, _) in enumerate(UserProfile.BloodGroup.choices)}
+    demand_matrix = np.zeros((len(blood_group_index), days + 1), dtype=np.int64)
+    groups_with_requests = set()
+    
+    for row in daily_totals:
+        demand_matrix[blood_group_index[row['blood_group']], (row['day'] - start_date).days] += row['total']
+        groups_with_requests.add(row['blood_group'])
     
     blood_data = {}
     
-    for blood_group in UserProfile.BloodGroup.choices:
-        bg_code = blood_group[0]
+    for bg_code, index in blood_group_index.items():
         if not bg_code:  # Skip empty blood groups
             continue
-            
-        bg_requests = historical_requests.filter(blood_group=bg_code)
         
         # If no requests, create some sample data for demonstration
-        if not bg_requests.exists():
+        if bg_code not in groups_with_requests:
             # Create realistic sample data based on blood group commonality
             base_demand = {
                 'A+': 2, 'A-': 1, 'B+': 1, 'B-': 0.5,
@@ -397,87 +408,13 @@ def get_historical_blood_data(hospital, days=90):
             daily_demand = [max(0, int(base_demand.get(bg_code, 1) + np.random.randint(-1, 2))) 
                           for _ in range(days)]
         else:
-            # Create daily demand data from real requests
-            daily_demand = []
-            current_date = start_date
-            
-            while current_date <= end_date:
-                day_requests = bg_requests.filter(created_at__date=current_date)
-                total_units = day_requests.aggregate(total=Sum('units_required'))['total'] or 0
-                daily_demand.append(total_units)
-                current_date += timedelta(days=1)
+            # Daily demand data from real requests
+            daily_demand = demand_matrix[index].tolist()
         
         blood_data[bg_code] = daily_demand
     
     return blood_data
 
-def predict_using_linear_regression(data, days_to_predict):
-    """Predict using linear regression"""
-    if len(data) < 2:
-        return np.mean(data) if data else 0
-    
-    X = np.array(range(len(data))).reshape(-1, 1)
-    y = np.array(data)
-    
-    model = LinearRegression()
-    model.fit(X, y)
-    
-    # Predict next days
-    future_days = np.array(range(len(data), len(data) + days_to_predict)).reshape(-1, 1)
-    predictions = model.predict(future_days)
-    
-    return max(0, np.mean(predictions))
-
-def predict_using_moving_average(data, days_to_predict, window=7):
-    """Predict using moving average"""
-    if len(data) < window:
-        return np.mean(data) if data else 0
-    
-    moving_avg = np.convolve(data, np.ones(window)/window, mode='valid')
-    return np.mean(moving_avg[-5:]) if len(moving_avg) >= 5 else np.mean(moving_avg)
-
-def predict_using_seasonal_patterns(data, days_to_predict):
-    """Predict considering weekly patterns"""
-    if len(data) < 14:  # Need at least 2 weeks of data
-        return np.mean(data) if data else 0
-    
-    # Group by day of week
-    day_patterns = {}
-    for i, value in enumerate(data[-14:]):  # Last 2 weeks
-        day_of_week = i % 7
-        if day_of_week not in day_patterns:
-            day_patterns[day_of_week] = []
-        day_patterns[day_of_week].append(value)
-    
-    # Average by day of week
-    day_averages = {day: np.mean(values) for day, values in day_patterns.items()}
-    
-    # Predict next days based on day patterns
-    next_days = [day_averages.get((len(data) + i) % 7, 0) for i in range(days_to_predict)]
-    
-    return np.mean(next_days)
-
-def calculate_prediction_confidence(data):
-    """Calculate confidence score for predictions"""
-    if len(data) < 7:
-        return {'level': 'Low', 'score': 0.3, 'reason': 'Insufficient historical data'}
-    
-    # Calculate variance (less variance = more confidence)
-    variance = np.var(data)
-    if variance == 0:
-        confidence_score = 0.9
-    else:
-        confidence_score = max(0.1, 1 - (variance / (np.mean(data) + 1)))
-    
-    if confidence_score >= 0.8:
-        level = 'High'
-    elif confidence_score >= 0.6:
-        level = 'Medium'
-    else:
-        level = 'Low'
-    
-    return {'level': level, 'score': confidence_score, 'reason': f'Based on {len(data)} data points'}
-
 def get_demand_trend(data):
     """Get demand trend (increasing, decreasing, stable)"""
     if len(data) < 7:
@@ -862,7 +799,7 @@ def update_donor_analytics(donor):
 
 def update_hospital_analytics(hospital):
     """Update analytics for a specific hospital"""
-    analytics, created = HospitalAnalytics.objects.get_or_create(hospital=hospital)
+    analytics, created = HospitalAnalytics.get_or_create_counted(hospital.id)
     
     # Calculate fulfillment rate
     total_requests = hospital.blood_requests.count()
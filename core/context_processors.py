@@ -5,6 +5,7 @@ from .models import GlobalSetting
 def global_settings(request):
     """
     Make global settings available in all templates
+    (served from GlobalSetting's process-local cache, no query per render)
     """
     try:
         settings = GlobalSetting.load()
@@ -15,4 +16,14 @@ def global_settings(request):
         # Return empty dict if settings not available
         return {
             'global_settings': None,
-        }
\ No newline at end of file
+        }
+
+def notification_counts(request):
+    """
+    Unread notification badge count, read from the denormalized counter on
+    the already-loaded user (no query per page render)
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {'unread_notification_count': 0}
+    return {'unread_notification_count': user.unread_notification_count}
@@ -0,0 +1,208 @@
+# ============================================================================ #
+# DEMAND FORECASTING KERNEL
+# ============================================================================ #
+# Pure NumPy forecasting helpers with no Django imports, so they can run in
+# worker processes (see services.forecast_all_hospitals).
+#
+# Every kernel takes a (series x days) matrix and fits all rows at once with
+# closed-form arithmetic; the predict_using_* functions are single-series
+# wrappers kept for existing callers.
+
+import numpy as np
+
+# Weights of the blended forecast: trend, moving average, weekly seasonality
+FORECAST_WEIGHTS = (0.4, 0.3, 0.3)
+
+def fit_linear_trend(series, days_to_predict):
+    """
+    Least-squares trend per row, averaged over the next days_to_predict days.
+    Closed form of a one-feature linear regression on the day index.
+    """
+    series = np.asarray(series, dtype=float)
+    length = series.shape[1]
+    if length < 2:
+        return series.mean(axis=1) if length else np.zeros(len(series))
+    
+    x_centered = np.arange(length) - (length - 1) / 2
+    slope = series @ x_centered / (x_centered @ x_centered)
+    intercept = series.mean(axis=1) - slope * (length - 1) / 2
+    
+    # Mean of the fitted line over days length .. length + days_to_predict - 1
+    future_mean = length + (days_to_predict - 1) / 2
+    return np.maximum(0, intercept + slope * future_mean)
+
+def moving_average_level(series, window=7):
+    """Mean of the last five `window`-day moving averages per row"""
+    series = np.asarray(series, dtype=float)
+    length = series.shape[1]
+    if length < window:
+        return series.mean(axis=1) if length else np.zeros(len(series))
+    
+    cumulative = np.cumsum(np.pad(series, ((0, 0), (1, 0))), axis=1)
+    moving_avg = (cumulative[:, window:] - cumulative[:, :-window]) / window
+    return moving_avg[:, -5:].mean(axis=1)
+
+def weekly_seasonal_level(series, days_to_predict):
+    """Average of the next days' weekday means over the last two weeks, per row"""
+    series = np.asarray(series, dtype=float)
+    length = series.shape[1]
+    if length < 14:  # Need at least 2 weeks of data
+        return series.mean(axis=1) if length else np.zeros(len(series))
+    
+    last_two_weeks = series[:, -14:]
+    day_averages = (last_two_weeks[:, :7] + last_two_weeks[:, 7:]) / 2
+    next_days = (length + np.arange(days_to_predict)) % 7
+    return day_averages[:, next_days].mean(axis=1)
+
+def prediction_confidence_scores(series):
+    """Confidence score per row (less variance = more confidence)"""
+    series = np.asarray(series, dtype=float)
+    if series.shape[1] < 7:
+        return np.full(len(series), 0.3)
+    
+    variance = series.var(axis=1)
+    safe_variance = np.where(variance == 0, 1, variance)
+    scores = np.maximum(0.1, 1 - (safe_variance / (series.mean(axis=1) + 1)))
+    return np.where(variance == 0, 0.9, scores)
+
+def demand_trends(series):
+    """Trend label per row (Increasing, Decreasing or Stable)"""
+    series = np.asarray(series, dtype=float)
+    length = series.shape[1]
+    if length < 7:
+        return ['Insufficient data'] * len(series)
+    
+    recent_avg = series[:, -7:].mean(axis=1)
+    if length >= 14:
+        previous_avg = series[:, -14:-7].mean(axis=1)
+    elif length > 7:
+        previous_avg = series[:, :-7].mean(axis=1)
+    else:
+        previous_avg = np.full(len(series), np.nan)
+    
+    return np.select(
+        [recent_avg > previous_avg * 1.2, recent_avg < previous_avg * 0.8],
+        ['Increasing', 'Decreasing'],
+        default='Stable'
+    ).tolist()
+
+def forecast_matrix(series, days):
+    """
+    Blend the trend, moving-average and seasonal forecasts for every row.
+    Returns arrays of the final forecast, confidence scores and trend labels.
+    """
+    trend_weight, average_weight, seasonal_weight = FORECAST_WEIGHTS
+    final = (
+        fit_linear_trend(series, days) * trend_weight +
+        moving_average_level(series) * average_weight +
+        weekly_seasonal_level(series, days) * seasonal_weight
+    )
+    return {
+        'final': final,
+        'confidence': prediction_confidence_scores(series),
+        'trend': demand_trends(series),
+    }
+
+def predict_using_linear_regression(data, days_to_predict):
+    """Predict using linear regression"""
+    if len(data) == 0:
+        return 0
+    return fit_linear_trend(np.asarray(data)[np.newaxis], days_to_predict)[0]
+
+def predict_using_moving_average(data, days_to_predict, window=7):
+    """Predict using moving average"""
+    if len(data) == 0:
+        return 0
+    return moving_average_level(np.asarray(data)[np.newaxis], window)[0]
+
+def predict_using_seasonal_patterns(data, days_to_predict):
+    """Predict considering weekly patterns"""
+    if len(data) == 0:
+        return 0
+    return weekly_seasonal_level(np.asarray(data)[np.newaxis], days_to_predict)[0]
+
+def describe_confidence(score, data_points):
+    """Confidence dict (level, score, reason) for a confidence score"""
+    if data_points < 7:
+        return {'level': 'Low', 'score': 0.3, 'reason': 'Insufficient historical data'}
+    
+    if score >= 0.8:
+        level = 'High'
+    elif score >= 0.6:
+        level = 'Medium'
+    else:
+        level = 'Low'
+    
+    return {'level': level, 'score': float(score), 'reason': f'Based on {data_points} data points'}
+
+def calculate_prediction_confidence(data):
+    """Calculate confidence score for predictions"""
+    if len(data) < 7:
+        return describe_confidence(0.3, len(data))
+    return describe_confidence(prediction_confidence_scores(np.asarray(data)[np.newaxis])[0], len(data))
+
+def get_demand_trend(data):
+    """Get demand trend (increasing, decreasing, stable)"""
+    return demand_trends(np.asarray(data)[np.newaxis])[0]
+
+def recommend_stock_level(current_stock, predicted_demand):
+    """Stock management recommendation for a predicted demand"""
+    stock_ratio = current_stock / (predicted_demand + 1)  # +1 to avoid division by zero
+    
+    if stock_ratio >= 2.0:
+        return "Adequate stock - maintain current levels"
+    elif stock_ratio >= 1.0:
+        return "Sufficient stock - monitor closely"
+    elif stock_ratio >= 0.5:
+        return "Low stock - consider replenishment"
+    else:
+        return "Critical stock - urgent replenishment needed"
+
+def build_forecast(final_prediction, confidence_score, trend, data_points, current_stock):
+    """Prediction dict for one blood group"""
+    confidence = describe_confidence(confidence_score, data_points)
+    return {
+        'predicted_demand': max(0, round(float(final_prediction))),
+        'confidence': confidence,
+        'confidence_score': confidence['score'],
+        'historical_data_points': data_points,
+        'trend': trend,
+        'recommendation': recommend_stock_level(current_stock, final_prediction)
+    }
+
+def forecast_series(blood_data, days, current_stock):
+    """
+    Forecast one blood group's demand from its daily history.
+    Returns None when there are fewer than 7 data points.
+    """
+    if len(blood_data) < 7:  # Minimum data points
+        return None
+    
+    result = forecast_matrix(np.asarray(blood_data)[np.newaxis], days)
+    return build_forecast(result['final'][0], result['confidence'][0], result['trend'][0],
+                          len(blood_data), current_stock)
+
+def forecast_hospital_chunk(blood_groups, demand_matrices, stock_levels, days):
+    """
+    Forecast every blood group for a chunk of hospitals in one kernel call.
+    demand_matrices is (hospitals x blood groups x days), stock_levels is
+    (hospitals x blood groups). Returns one predictions dict per hospital.
+    """
+    demand_matrices = np.asarray(demand_matrices)
+    hospital_count, group_count, data_points = demand_matrices.shape
+    if data_points < 7:  # Minimum data points
+        return [{} for _ in range(hospital_count)]
+    
+    result = forecast_matrix(demand_matrices.reshape(hospital_count * group_count, data_points), days)
+    
+    results = []
+    for hospital in range(hospital_count):
+        predictions = {}
+        for index, blood_group in enumerate(blood_groups):
+            row = hospital * group_count + index
+            predictions[blood_group] = build_forecast(
+                result['final'][row], result['confidence'][row], result['trend'][row],
+                data_points, int(stock_levels[hospital][index])
+            )
+        results.append(predictions)
+    return results
@@ -1,6 +1,7 @@
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm, PasswordChangeForm
 from django import forms
 from django.utils import timezone
+from datetime import timedelta
 
 from .models import (
     CustomUser, UserProfile, HospitalProfile, ContactMessage,
@@ -401,6 +402,21 @@ class AnalyticsFilterForm(forms.Form):
                 raise forms.ValidationError("Start date cannot be after end date.")
         
         return cleaned_data
+    
+    def get_date_range(self):
+        """Resolve the selected range to (start_date, end_date) for rollup queries"""
+        if self.cleaned_data.get('date_range') == 'custom':
+            return self.cleaned_data['start_date'], self.cleaned_data['end_date']
+        end_date = timezone.localdate()
+        return end_date - timedelta(days=int(self.cleaned_data.get('date_range') or 30)), end_date
+    
+    def get_demand_summary(self, hospital):
+        """Per blood group demand for the selected range, read from DailyBloodDemand"""
+        from . import services
+        start_date, end_date = self.get_date_range()
+        return services.get_demand_summary(
+            hospital, start_date, end_date, blood_group=self.cleaned_data.get('blood_group') or None
+        )
 
 class AIPredictionFilterForm(forms.Form):
     """Form for filtering AI prediction logs"""
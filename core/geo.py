@@ -0,0 +1,52 @@
+# ============================================================================ #
+# GEO HELPERS
+# ============================================================================ #
+# Pure NumPy distance and grid-bucket helpers (no Django imports). Donor
+# coordinates are bucketed into fixed-size latitude/longitude grid cells so
+# a radius search can be narrowed with an indexed range query, then refined
+# with exact haversine distances.
+
+import math
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+# Grid cell size in degrees (about 11 km of latitude)
+GRID_CELL_DEGREES = 0.1
+
+KM_PER_DEGREE_LATITUDE = 111.32
+
+def grid_cell(latitude, longitude):
+    """(row, column) grid cell of a coordinate, or (None, None) when unknown"""
+    if latitude is None or longitude is None:
+        return None, None
+    return math.floor(latitude / GRID_CELL_DEGREES), math.floor(longitude / GRID_CELL_DEGREES)
+
+def grid_cell_ranges(latitude, longitude, radius_km):
+    """
+    Inclusive (row, column) cell ranges of the bounding box of a circle.
+    Every point within radius_km of the centre lies in these cells.
+    """
+    lat_delta = radius_km / KM_PER_DEGREE_LATITUDE
+    # Longitude degrees shrink towards the poles; clamp so the box stays finite
+    lng_delta = radius_km / (KM_PER_DEGREE_LATITUDE * max(math.cos(math.radians(latitude)), 0.01))
+
+    rows = (math.floor((latitude - lat_delta) / GRID_CELL_DEGREES),
+            math.floor((latitude + lat_delta) / GRID_CELL_DEGREES))
+    columns = (math.floor((longitude - lng_delta) / GRID_CELL_DEGREES),
+               math.floor((longitude + lng_delta) / GRID_CELL_DEGREES))
+    return rows, columns
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    """
+    Great-circle distance in km from one point to an array of points.
+    Missing coordinates (NaN) give NaN distances.
+    """
+    lat1 = np.radians(latitude)
+    lat2 = np.radians(np.asarray(latitudes, dtype=float))
+    d_lat = lat2 - lat1
+    d_lng = np.radians(np.asarray(longitudes, dtype=float) - longitude)
+
+    a = np.sin(d_lat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(d_lng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
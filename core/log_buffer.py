@@ -0,0 +1,86 @@
+# ============================================================================ #
+# BUFFERED LOG WRITER
+# ============================================================================ #
+# Append-only log rows (AIPredictionLog, ChatbotConversation) are collected in
+# memory and written with one bulk_create per model, either when the buffer
+# reaches PREDICTION_LOG_BUFFER_SIZE rows or every PREDICTION_LOG_FLUSH_INTERVAL
+# seconds, from a daemon thread. Whatever is left is flushed when the process
+# exits. A buffer size of 0 writes every row immediately.
+
+import atexit
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedLogWriter:
+    """Thread-safe in-memory buffer of unsaved model instances, flushed in bulk"""
+
+    def __init__(self, max_size, flush_interval):
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self._reset()
+        atexit.register(self.flush)
+
+    def _reset(self):
+        # Called again in a forked child: the parent's thread and lock do not carry over
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._rows = []
+        self._thread = None
+
+    def add(self, instance):
+        """Queue an unsaved instance for the next bulk insert"""
+        if self.max_size <= 0:
+            instance.save()
+            return
+        if self._pid != os.getpid():
+            self._reset()
+
+        with self._lock:
+            self._rows.append(instance)
+            full = len(self._rows) >= self.max_size
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='log-buffer-flush', daemon=True)
+                self._thread.start()
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """Write every buffered row (one bulk_create per model); returns the number written"""
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if not rows:
+            return 0
+
+        by_model = {}
+        for instance in rows:
+            by_model.setdefault(type(instance), []).append(instance)
+        written = 0
+        for model, instances in by_model.items():
+            try:
+                model.objects.bulk_create(instances, batch_size=500)
+                written += len(instances)
+            except Exception:
+                logger.exception("Failed to write %d buffered %s row(s)", len(instances), model.__name__)
+        return written
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+            # The thread's own connection is not closed by the request cycle
+            connections.close_all()
+
+
+log_writer = BufferedLogWriter(
+    max_size=settings.HEMOVITAL_SETTINGS['PREDICTION_LOG_BUFFER_SIZE'],
+    flush_interval=settings.HEMOVITAL_SETTINGS['PREDICTION_LOG_FLUSH_INTERVAL']
+)
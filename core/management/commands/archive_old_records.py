@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import services
+
+
+class Command(BaseCommand):
+    help = ("Archive rows older than their retention TTL to compressed JSONL files and delete them "
+            "(notifications, prediction logs, chatbot conversations)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--table', choices=sorted(services.RETENTION_POLICIES),
+                            help="Only prune this table (default: all)")
+        parser.add_argument('--days', type=int,
+                            help="Override the table's retention TTL (requires --table)")
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Rows archived and deleted per chunk")
+        parser.add_argument('--no-archive', action='store_true', help="Delete without writing archive files")
+        parser.add_argument('--dry-run', action='store_true', help="Only count the rows that would be pruned")
+
+    def handle(self, *args, **options):
+        if options['days'] is not None and not options['table']:
+            raise CommandError("--days overrides one table's TTL; pass --table as well.")
+        tables = [options['table']] if options['table'] else list(services.RETENTION_POLICIES)
+        days = options['days']
+
+        for table in tables:
+            count = services.archive_expired_rows(
+                table,
+                days=days,
+                batch_size=options['batch_size'],
+                archive=not options['no_archive'],
+                dry_run=options['dry_run']
+            )
+            verb = "Would prune" if options['dry_run'] else "Pruned"
+            self.stdout.write(self.style.SUCCESS(f"{verb} {count} {table} row(s)."))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core import services
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the hot request-list queries and fail if any sequentially scans a large table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-rows', type=int, default=10000,
+                            help="Only tables with at least this many rows count as large")
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            raise CommandError(f"Query plan checks are not supported on {connection.vendor}.")
+
+        failures = []
+        for name, (plan, scanned) in services.check_hot_query_plans(min_rows=options['min_rows']).items():
+            if options['verbosity'] >= 2:
+                self.stdout.write(f"{name}:\n{plan}\n")
+            if scanned:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"{name}: sequential scan on {', '.join(scanned)}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{name}: ok"))
+
+        if failures:
+            raise CommandError(f"{len(failures)} hot query(ies) use sequential scans: {', '.join(failures)}")
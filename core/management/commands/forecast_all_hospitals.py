@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import services
+
+
+class Command(BaseCommand):
+    help = "Forecast blood demand for every hospital in one batch (intended for the nightly run)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help="Number of days to forecast")
+        parser.add_argument('--history-days', type=int, default=90,
+                            help="Days of demand history used to fit the models")
+        parser.add_argument('--workers', type=int,
+                            help="Worker processes for the model fits (defaults to FORECAST_WORKERS)")
+        parser.add_argument('--no-log', action='store_true', help="Skip writing AIPredictionLog rows")
+
+    def handle(self, *args, **options):
+        if options['history_days'] < 7:
+            raise CommandError("--history-days must be at least 7.")
+
+        started = time.monotonic()
+        forecasts = services.forecast_all_hospitals(
+            days=options['days'],
+            history_days=options['history_days'],
+            workers=options['workers'],
+            log_predictions=not options['no_log']
+        )
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Forecast {len(forecasts)} hospital(s) in {elapsed:.1f}s."
+        ))
@@ -0,0 +1,62 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import services
+from core.models import PincodeLocation
+
+
+class Command(BaseCommand):
+    help = ("Load pincode coordinates from a CSV file (columns: pincode, latitude, longitude, "
+            "optional city/district and state/statename) and geocode profiles")
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', help="Path of the pincode CSV file")
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Number of rows written per bulk insert/update")
+        parser.add_argument('--no-geocode', action='store_true',
+                            help="Only load the reference table, do not refresh profile coordinates")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['csv_path'], newline='', encoding='utf-8') as csv_file:
+                locations = self.read_locations(csv.DictReader(csv_file))
+        except OSError as error:
+            raise CommandError(f"Cannot read {options['csv_path']}: {error}")
+
+        PincodeLocation.objects.bulk_create(
+            locations.values(),
+            batch_size=options['batch_size'],
+            update_conflicts=True,
+            unique_fields=['pincode'],
+            update_fields=['latitude', 'longitude', 'city', 'state']
+        )
+        self.stdout.write(self.style.SUCCESS(f"Loaded {len(locations)} pincode(s)."))
+
+        if not options['no_geocode']:
+            located = services.geocode_profiles(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"Geocoded {located} profile(s)."))
+
+    def read_locations(self, rows):
+        """First valid row per pincode; rows without usable coordinates are skipped"""
+        locations = {}
+        for row in rows:
+            row = {key.strip().lower(): (value or '').strip() for key, value in row.items() if key}
+            pincode = row.get('pincode', '')
+            if len(pincode) != 6 or not pincode.isdigit() or pincode in locations:
+                continue
+            try:
+                latitude, longitude = float(row['latitude']), float(row['longitude'])
+            except (KeyError, ValueError):
+                continue
+            if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                continue
+
+            locations[pincode] = PincodeLocation(
+                pincode=pincode,
+                latitude=latitude,
+                longitude=longitude,
+                city=(row.get('city') or row.get('district', ''))[:100],
+                state=(row.get('state') or row.get('statename', ''))[:100]
+            )
+        return locations
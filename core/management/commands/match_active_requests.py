@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import services
+from core.models import BloodRequest
+
+
+class Command(BaseCommand):
+    help = "Match every active blood request against the donor pool in one batch"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-n', type=int, default=10, help="Matches kept per request")
+        parser.add_argument('--spread', action='store_true',
+                            help="Spread donors across requests instead of giving every request the same top donors")
+        parser.add_argument('--max-per-donor', type=int, default=1,
+                            help="With --spread, the most requests a single donor is matched to")
+        parser.add_argument('--notify', action='store_true', help="Send BLOOD_REQUEST notifications to matched donors")
+        parser.add_argument('--no-log', action='store_true', help="Skip writing AIPredictionLog rows")
+
+    def handle(self, *args, **options):
+        if options['top_n'] < 1 or options['max_per_donor'] < 1:
+            raise CommandError("--top-n and --max-per-donor must be at least 1.")
+
+        started = time.monotonic()
+        blood_requests = list(
+            BloodRequest.objects.filter(is_active=True).select_related('hospital__hospitalprofile').order_by('id')
+        )
+        matches = services.match_active_requests(
+            blood_requests,
+            top_n=options['top_n'],
+            spread=options['spread'],
+            max_matches_per_donor=options['max_per_donor'],
+            log_predictions=not options['no_log']
+        )
+
+        notified = 0
+        if options['notify']:
+            for blood_request in blood_requests:
+                donors = [match['donor'] for match in matches[blood_request.id]]
+                notified += services.notify_donors_of_request(blood_request, donors)
+
+        elapsed = time.monotonic() - started
+        matched = sum(len(results) for results in matches.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Matched {len(matches)} request(s) to {matched} donor slot(s) in {elapsed:.1f}s"
+            + (f", sent {notified} notification(s)." if options['notify'] else ".")
+        ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import services
+from core.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Rebuild the DailyBloodDemand rollup table from BloodRequest history"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hospital', type=int, help="Only rebuild rows for this hospital user id")
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Number of rollup rows written per insert")
+
+    def handle(self, *args, **options):
+        hospital = None
+        if options['hospital']:
+            try:
+                hospital = CustomUser.objects.get(pk=options['hospital'], role=CustomUser.Role.HOSPITAL)
+            except CustomUser.DoesNotExist:
+                raise CommandError(f"Hospital {options['hospital']} does not exist.")
+
+        created = services.rebuild_daily_demand(hospital=hospital, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {created} daily demand row(s)."))
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import services
+
+
+class Command(BaseCommand):
+    help = "Recompute donor and hospital analytics flagged dirty by recent activity (write-behind)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int,
+                            help="Minimum seconds between recomputes of one user (defaults to ANALYTICS_REFRESH_INTERVAL)")
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows recomputed per bulk update")
+        parser.add_argument('--loop', action='store_true', help="Keep running, polling for dirty rows")
+        parser.add_argument('--poll-interval', type=float, default=30.0,
+                            help="With --loop, seconds to wait between passes")
+
+    def handle(self, *args, **options):
+        donors = hospitals = 0
+        try:
+            while True:
+                refreshed = services.refresh_dirty_analytics(
+                    interval=options['interval'], batch_size=options['batch_size']
+                )
+                donors += refreshed[0]
+                hospitals += refreshed[1]
+                if not options['loop']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed analytics for {donors} donor(s) and {hospitals} hospital(s)."
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core import services
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized donation features stored on DonorAnalytics"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Number of donors written per bulk update")
+
+    def handle(self, *args, **options):
+        refreshed = services.refresh_all_donor_features(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Refreshed donation features for {refreshed} donor(s)."))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import services
+
+
+class Command(BaseCommand):
+    help = "Process queued donor match-and-notify jobs (keep running to serve new requests)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain the queue once and exit")
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help="Seconds to wait before polling an empty queue again")
+        parser.add_argument('--max-jobs', type=int, help="Exit after processing this many jobs")
+
+    def handle(self, *args, **options):
+        max_jobs = options['max_jobs']
+        processed = 0
+        try:
+            while max_jobs is None or processed < max_jobs:
+                remaining = None if max_jobs is None else max_jobs - processed
+                ran = services.process_notification_jobs(max_jobs=remaining)
+                processed += ran
+                if options['once']:
+                    break
+                if not ran:
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} notification job(s)."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core import services
+
+
+class Command(BaseCommand):
+    help = "Score every donor's retention risk and store it on DonorAnalytics (run nightly)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Number of donors scored and written per chunk")
+
+    def handle(self, *args, **options):
+        scored = services.score_all_donor_retention(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Scored retention risk for {scored} donor(s)."))
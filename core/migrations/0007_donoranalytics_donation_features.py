@@ -0,0 +1,76 @@
+# Generated by Django 4.2.11 on 2026-10-16 22:41
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Q
+from django.utils import timezone
+
+
+def backfill_donation_features(apps, schema_editor):
+    CustomUser = apps.get_model('core', 'CustomUser')
+    DonorAnalytics = apps.get_model('core', 'DonorAnalytics')
+    now = timezone.now()
+    completed = Q(donations__status='Completed')
+
+    donor_stats = CustomUser.objects.filter(role='DONOR').annotate(
+        completed_count=Count('donations', filter=completed),
+        first_date=Min('donations__donation_date', filter=completed),
+        last_date=Max('donations__donation_date', filter=completed),
+        recent_90d=Count('donations', filter=Q(donations__created_at__gte=now - timedelta(days=90))),
+        recent_180d=Count('donations', filter=Q(donations__created_at__gte=now - timedelta(days=180))),
+    ).values('id', 'completed_count', 'first_date', 'last_date', 'recent_90d', 'recent_180d')
+
+    for stats in donor_stats.iterator(chunk_size=1000):
+        DonorAnalytics.objects.update_or_create(
+            donor_id=stats['id'],
+            defaults={
+                'completed_donations': stats['completed_count'],
+                'first_donation_date': stats['first_date'],
+                'last_donation_date': stats['last_date'],
+                'responses_90d': stats['recent_90d'],
+                'responses_180d': stats['recent_180d'],
+                'features_updated_at': now,
+            }
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_alter_hospitalprofile_admin_dob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='donoranalytics',
+            name='completed_donations',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='donoranalytics',
+            name='features_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='donoranalytics',
+            name='first_donation_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='donoranalytics',
+            name='last_donation_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='donoranalytics',
+            name='responses_180d',
+            field=models.PositiveIntegerField(default=0, help_text='Responses to requests in the last 180 days'),
+        ),
+        migrations.AddField(
+            model_name='donoranalytics',
+            name='responses_90d',
+            field=models.PositiveIntegerField(default=0, help_text='Responses to requests in the last 90 days'),
+        ),
+        migrations.RunPython(backfill_donation_features, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.11 on 2026-10-16 22:44
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+
+
+def backfill_daily_demand(apps, schema_editor):
+    BloodRequest = apps.get_model('core', 'BloodRequest')
+    DailyBloodDemand = apps.get_model('core', 'DailyBloodDemand')
+
+    daily_totals = BloodRequest.objects.annotate(
+        day=TruncDate('created_at')
+    ).values('hospital_id', 'blood_group', 'day').annotate(
+        units=Sum('units_required'), requests=Count('id')
+    ).order_by()
+
+    DailyBloodDemand.objects.bulk_create(
+        (
+            DailyBloodDemand(
+                hospital_id=row['hospital_id'], blood_group=row['blood_group'], date=row['day'],
+                units_required=row['units'], request_count=row['requests']
+            )
+            for row in daily_totals.iterator(chunk_size=1000)
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_donoranalytics_donation_features'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyBloodDemand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('blood_group', models.CharField(choices=[('A+', 'A+'), ('A-', 'A-'), ('B+', 'B+'), ('B-', 'B-'), ('O+', 'O+'), ('O-', 'O-'), ('AB+', 'AB+'), ('AB-', 'AB-')], max_length=3)),
+                ('date', models.DateField()),
+                ('units_required', models.IntegerField(default=0)),
+                ('request_count', models.IntegerField(default=0)),
+                ('hospital', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_demand', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('hospital', 'blood_group', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_daily_demand, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.11 on 2026-10-16 22:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_dailyblooddemand'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='donoranalytics',
+            name='retention_scored_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='donoranalytics',
+            name='retention_risk_score',
+            field=models.FloatField(db_index=True, default=0.0),
+        ),
+    ]
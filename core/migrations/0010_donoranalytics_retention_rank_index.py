@@ -0,0 +1,22 @@
+# Generated by Django 4.2.11 on 2026-10-16 22:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_donoranalytics_retention_scored_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='donoranalytics',
+            name='retention_risk_score',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddIndex(
+            model_name='donoranalytics',
+            index=models.Index(fields=['-retention_risk_score', 'donor'], name='donor_retention_rank_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.11 on 2026-10-16 23:07
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_notification_jobs'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='notificationjob',
+            name='notificationjob_queue_idx',
+        ),
+        migrations.AddField(
+            model_name='notificationjob',
+            name='run_after',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='notificationjob',
+            name='wave',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='notificationjob',
+            index=models.Index(fields=['status', 'run_after'], name='notificationjob_queue_idx'),
+        ),
+    ]
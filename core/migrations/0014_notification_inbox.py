@@ -0,0 +1,35 @@
+# Generated by Django 4.2.11 on 2026-10-16 23:08
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_unread_counts(apps, schema_editor):
+    CustomUser = apps.get_model('core', 'CustomUser')
+    Notification = apps.get_model('core', 'Notification')
+
+    unread = Notification.objects.filter(
+        recipient=OuterRef('pk'), is_read=False
+    ).order_by().values('recipient').annotate(total=Count('id')).values('total')
+    CustomUser.objects.update(unread_notification_count=Coalesce(Subquery(unread), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_notification_waves'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='unread_notification_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'is_read', '-created_at'], name='notification_inbox_idx'),
+        ),
+        migrations.RunPython(backfill_unread_counts, migrations.RunPython.noop),
+    ]
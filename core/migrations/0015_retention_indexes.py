@@ -0,0 +1,29 @@
+# Generated by Django 4.2.11 on 2026-10-16 23:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_notification_inbox'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='aipredictionlog',
+            index=models.Index(fields=['timestamp'], name='aipredictionlog_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='aipredictionlog',
+            index=models.Index(fields=['prediction_type', '-timestamp'], name='aipredictionlog_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatbotconversation',
+            index=models.Index(fields=['created_at'], name='chatbot_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['created_at'], name='notification_created_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.11 on 2026-10-16 23:11
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_retention_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='aipredictionlog',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='chatbotconversation',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.11 on 2026-10-16 23:13
+
+from django.db import migrations, models
+from django.db.models import Q
+from django.utils import timezone
+
+
+def flag_existing_analytics(apps, schema_editor):
+    # Dashboards no longer recompute on view; let the first refresh run cover every user
+    now = timezone.now()
+    CustomUser = apps.get_model('core', 'CustomUser')
+    DonorAnalytics = apps.get_model('core', 'DonorAnalytics')
+    HospitalAnalytics = apps.get_model('core', 'HospitalAnalytics')
+
+    # Users registered before analytics existed have no row to flag
+    donors = CustomUser.objects.filter(
+        Q(role='DONOR') | Q(userprofile__isnull=False), analytics__isnull=True
+    ).values_list('id', flat=True).distinct()
+    DonorAnalytics.objects.bulk_create([DonorAnalytics(donor_id=donor_id) for donor_id in donors.iterator()], batch_size=1000)
+    hospitals = CustomUser.objects.filter(
+        Q(role='HOSPITAL') | Q(hospitalprofile__isnull=False), hospital_analytics__isnull=True
+    ).values_list('id', flat=True).distinct()
+    HospitalAnalytics.objects.bulk_create(
+        [HospitalAnalytics(hospital_id=hospital_id) for hospital_id in hospitals.iterator()], batch_size=1000
+    )
+
+    DonorAnalytics.objects.update(dirty_since=now)
+    HospitalAnalytics.objects.update(dirty_since=now)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_buffered_log_timestamps'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='donoranalytics',
+            name='computed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='donoranalytics',
+            name='dirty_since',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='hospitalanalytics',
+            name='computed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='hospitalanalytics',
+            name='dirty_since',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='donoranalytics',
+            index=models.Index(condition=models.Q(('dirty_since__isnull', False)), fields=['dirty_since'], name='donoranalytics_dirty_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hospitalanalytics',
+            index=models.Index(condition=models.Q(('dirty_since__isnull', False)), fields=['dirty_since'], name='hospitalanalytics_dirty_idx'),
+        ),
+        migrations.RunPython(flag_existing_analytics, migrations.RunPython.noop),
+    ]
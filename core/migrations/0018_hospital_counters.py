@@ -0,0 +1,75 @@
+# Generated by Django 4.2.11 on 2026-10-16 23:14
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_hospital_counters(apps, schema_editor):
+    HospitalAnalytics = apps.get_model('core', 'HospitalAnalytics')
+    HospitalProfile = apps.get_model('core', 'HospitalProfile')
+    BloodRequest = apps.get_model('core', 'BloodRequest')
+    Donation = apps.get_model('core', 'Donation')
+    CustomUser = apps.get_model('core', 'CustomUser')
+
+    # Hospitals registered before analytics existed have no row; the updates below would skip them
+    missing = CustomUser.objects.filter(
+        Q(role='HOSPITAL') | Q(hospitalprofile__isnull=False), hospital_analytics__isnull=True
+    ).values_list('id', flat=True).distinct()
+    HospitalAnalytics.objects.bulk_create(
+        [HospitalAnalytics(hospital_id=hospital_id) for hospital_id in missing.iterator()], batch_size=1000
+    )
+
+    def request_count(**filters):
+        rows = BloodRequest.objects.filter(hospital=OuterRef('hospital'), **filters)
+        return Coalesce(Subquery(rows.order_by().values('hospital').annotate(n=Count('id')).values('n')), 0)
+
+    HospitalAnalytics.objects.update(
+        total_requests=request_count(),
+        active_requests=request_count(is_active=True),
+        fulfilled_requests=request_count(status='Fulfilled'),
+    )
+
+    # Donations are attributed to a hospital by name
+    for hospital_id, hospital_name in HospitalProfile.objects.values_list('user_id', 'hospital_name').iterator():
+        stats = Donation.objects.filter(hospital_name=hospital_name).aggregate(
+            pending=Count('id', filter=Q(status='Pending')),
+            confirmed=Count('id', filter=Q(status='Confirmed')),
+            units=Sum('units', filter=Q(status='Confirmed')),
+        )
+        HospitalAnalytics.objects.filter(hospital_id=hospital_id).update(
+            pending_donations=stats['pending'],
+            confirmed_donations=stats['confirmed'],
+            confirmed_units=stats['units'] or 0,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_analytics_write_behind'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hospitalanalytics',
+            name='active_requests',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='hospitalanalytics',
+            name='confirmed_donations',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='hospitalanalytics',
+            name='confirmed_units',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='hospitalanalytics',
+            name='pending_donations',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_hospital_counters, migrations.RunPython.noop),
+    ]
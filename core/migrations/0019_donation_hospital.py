@@ -0,0 +1,74 @@
+# Generated by Django 4.2.11 on 2026-10-16 23:16
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+
+
+def backfill_donation_hospital(apps, schema_editor):
+    Donation = apps.get_model('core', 'Donation')
+    HospitalProfile = apps.get_model('core', 'HospitalProfile')
+    HospitalAnalytics = apps.get_model('core', 'HospitalAnalytics')
+
+    # Names shared by several hospitals are ambiguous and stay unlinked
+    hospitals_by_name = {}
+    for hospital_id, hospital_name in HospitalProfile.objects.values_list('user_id', 'hospital_name').iterator():
+        hospitals_by_name.setdefault(hospital_name, []).append(hospital_id)
+
+    last_pk = 0
+    while True:
+        rows = list(
+            Donation.objects.filter(pk__gt=last_pk, hospital__isnull=True)
+            .order_by('pk')
+            .values_list('pk', 'blood_request__hospital_id', 'hospital_name')[:BATCH_SIZE]
+        )
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+
+        pks_by_hospital = {}
+        for pk, request_hospital_id, hospital_name in rows:
+            hospital_id = request_hospital_id
+            if hospital_id is None and len(hospitals_by_name.get(hospital_name, ())) == 1:
+                hospital_id = hospitals_by_name[hospital_name][0]
+            if hospital_id is not None:
+                pks_by_hospital.setdefault(hospital_id, []).append(pk)
+        for hospital_id, pks in pks_by_hospital.items():
+            Donation.objects.filter(pk__in=pks).update(hospital_id=hospital_id)
+
+    # Donation counters were attributed by name; recount them by the new link
+    HospitalAnalytics.objects.update(pending_donations=0, confirmed_donations=0, confirmed_units=0)
+    stats = Donation.objects.filter(hospital__isnull=False).order_by().values('hospital').annotate(
+        pending=Count('id', filter=Q(status='Pending')),
+        confirmed=Count('id', filter=Q(status='Confirmed')),
+        units=Sum('units', filter=Q(status='Confirmed')),
+    )
+    for row in stats.iterator():
+        HospitalAnalytics.objects.filter(hospital_id=row['hospital']).update(
+            pending_donations=row['pending'],
+            confirmed_donations=row['confirmed'],
+            confirmed_units=row['units'] or 0,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_hospital_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='donation',
+            name='hospital',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='hospital_donations', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_donation_hospital, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['hospital', 'status'], name='donation_hospital_status_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.11 on 2026-10-16 23:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_donation_hospital'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bloodrequest',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['blood_group', 'urgency', '-created_at', 'expires_on'], name='bloodrequest_open_group_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bloodrequest',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['hospital', '-created_at'], name='bloodrequest_hospital_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bloodrequest',
+            index=models.Index(fields=['hospital', 'blood_group', 'created_at'], name='bloodrequest_demand_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bloodrequest',
+            index=models.Index(fields=['created_at'], name='bloodrequest_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bloodrequest',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['id'], name='bloodrequest_active_idx'),
+        ),
+    ]
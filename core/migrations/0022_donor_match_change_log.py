@@ -0,0 +1,22 @@
+# Generated by Django 4.2.11 on 2026-10-16 23:31
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_cache_table'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DonorMatchChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('donor_id', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.11 on 2026-10-16 23:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_donor_match_change_log'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['related_object_id', 'related_content_type'], name='notification_related_idx'),
+        ),
+    ]
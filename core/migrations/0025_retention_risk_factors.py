@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-16 23:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_notification_recipient_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='donoranalytics',
+            name='retention_risk_factors',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -1,12 +1,18 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils.translation import gettext_lazy as _
-from django.db.models.signals import post_save
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from django.core.cache import cache
+from django.conf import settings
+import time
 import uuid
 from datetime import timedelta
 from django.utils import timezone
 
+from .geo import grid_cell
+
 # ============================================================================ #
 # 1. AUTHENTICATION & PROFILE MODELS
 # ============================================================================ #
@@ -36,6 +42,8 @@ class CustomUser(AbstractUser):
     email = models.EmailField(_('email address'), unique=True)
     role = models.CharField(max_length=50, choices=Role.choices, default=Role.DONOR)
     hemo_id = models.CharField(max_length=20, unique=True, blank=True, null=True, editable=False)
+    # Denormalized badge count, kept in step with Notification.is_read via F() updates
+    unread_notification_count = models.PositiveIntegerField(default=0, editable=False)
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
     objects = CustomUserManager()
@@ -72,13 +80,37 @@ class UserProfile(models.Model):
     availability_radius = models.PositiveIntegerField(default=10, help_text="Availability radius in km")
     profile_completion_score = models.PositiveIntegerField(default=0)
     
+    # Cached from PincodeLocation; grid cells bucket donors for radius search
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    grid_row = models.IntegerField(null=True, blank=True)
+    grid_column = models.IntegerField(null=True, blank=True)
+    
     # Analytics fields
     total_donations = models.PositiveIntegerField(default=0)
     engagement_score = models.FloatField(default=0.0)
     last_activity = models.DateTimeField(null=True, blank=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['grid_row', 'grid_column'], name='userprofile_grid_idx'),
+        ]
+    
     def __str__(self): return f"Profile: {self.user.email}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._located_pincode = instance.__dict__.get('pincode')
+        instance._match_snapshot = instance.get_match_key()
+        return instance
+    
+    def get_match_key(self):
+        """Profile fields donor matching scores on (a change invalidates cached match pools)"""
+        return tuple(self.__dict__.get(field) for field in (
+            'is_available', 'blood_group', 'city', 'state', 'latitude', 'longitude', 'availability_radius'
+        ))
+    
     def calculate_profile_completion(self):
         """Calculate profile completion percentage"""
         fields = ['gender', 'date_of_birth', 'weight', 'blood_group', 'contact_number', 'address', 'city', 'state', 'pincode']
@@ -87,7 +119,16 @@ class UserProfile(models.Model):
     
     def save(self, *args, **kwargs):
         self.profile_completion_score = self.calculate_profile_completion()
+        if PincodeLocation.locate(self):
+            self.grid_row, self.grid_column = grid_cell(self.latitude, self.longitude)
         super().save(*args, **kwargs)
+        
+        match_key = self.get_match_key()
+        if match_key != getattr(self, '_match_snapshot', None):
+            record_donor_match_change(self.user_id)
+            self._match_snapshot = match_key
+        # Profile completion feeds the engagement score
+        mark_analytics_dirty(donor_ids=[self.user_id])
 
 class HospitalProfile(models.Model):
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, primary_key=True, related_name='hospitalprofile')
@@ -111,7 +152,49 @@ class HospitalProfile(models.Model):
     fulfillment_rate = models.FloatField(default=0.0)
     avg_response_time = models.FloatField(default=0.0, help_text="Average response time in hours")
     
+    # Cached from PincodeLocation
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    
     def __str__(self): return f"Hospital: {self.hospital_name}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._located_pincode = instance.__dict__.get('pincode')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        PincodeLocation.locate(self)
+        super().save(*args, **kwargs)
+
+class PincodeLocation(models.Model):
+    """Reference coordinates of a postal pincode (loaded with manage.py load_pincodes)"""
+    pincode = models.CharField(max_length=6, primary_key=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    city = models.CharField(max_length=100, blank=True)
+    state = models.CharField(max_length=100, blank=True)
+    
+    def __str__(self): return f"{self.pincode} ({self.latitude:.4f}, {self.longitude:.4f})"
+    
+    @classmethod
+    def locate(cls, profile):
+        """
+        Refresh a profile's cached latitude/longitude from its pincode.
+        Only looks up when the pincode changed or is still unresolved;
+        returns True when the coordinates were refreshed.
+        """
+        unchanged = profile.pincode == getattr(profile, '_located_pincode', None)
+        if unchanged and (profile.latitude is not None or not profile.pincode):
+            return False
+        
+        coordinates = None
+        if profile.pincode:
+            coordinates = cls.objects.filter(pincode=profile.pincode).values_list('latitude', 'longitude').first()
+        profile.latitude, profile.longitude = coordinates or (None, None)
+        profile._located_pincode = profile.pincode
+        return True
 
 # ============================================================================ #
 # 2. DONOR-RELATED MODELS
@@ -125,6 +208,7 @@ class Donation(models.Model):
         COMPLETED = 'Completed', 'Completed'
 
     donor = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='donations')
+    hospital = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='hospital_donations')
     hospital_name = models.CharField(max_length=255)
     location = models.CharField(max_length=100)
     donation_date = models.DateField()
@@ -143,6 +227,56 @@ class Donation(models.Model):
     def __str__(self):
         return f"{self.donor.username} - {self.status}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._counter_snapshot = instance.get_counter_key()
+        return instance
+
+    def get_counter_key(self):
+        """(hospital id, status, units) this donation contributes to HospitalAnalytics counters"""
+        return tuple(self.__dict__.get(field) for field in ('hospital_id', 'status', 'units'))
+
+    def get_counter_values(self, key):
+        """(hospital id, {counter: value}) for a counter key, or None without a hospital"""
+        if key is None or key[0] is None:
+            return None
+        confirmed = key[1] == self.DonationStatus.CONFIRMED
+        return key[0], {
+            'pending_donations': int(key[1] == self.DonationStatus.PENDING),
+            'confirmed_donations': int(confirmed),
+            'confirmed_units': (key[2] or 0) if confirmed else 0,
+        }
+
+    def resolve_hospital_id(self):
+        """Hospital of the linked blood request, else the one hospital registered under hospital_name"""
+        if self.blood_request_id:
+            return BloodRequest.objects.filter(pk=self.blood_request_id).values_list('hospital_id', flat=True).first()
+        if self.hospital_name:
+            matches = list(HospitalProfile.objects.filter(hospital_name=self.hospital_name).values_list('user_id', flat=True)[:2])
+            if len(matches) == 1:
+                return matches[0]
+        return None
+
+    def save(self, *args, **kwargs):
+        """Save and move this donation between the hospital's donation counters in one transaction"""
+        if self.hospital_id is None and self._state.adding:
+            self.hospital_id = self.resolve_hospital_id()
+        previous = getattr(self, '_counter_snapshot', None)
+        current = self.get_counter_key()
+        with transaction.atomic():
+            # Counters first: the post_save receivers may create the hospital's analytics row
+            if current != previous:
+                adjust_hospital_counters(self.get_counter_values(previous), self.get_counter_values(current))
+            super().save(*args, **kwargs)
+        self._counter_snapshot = current
+
+    class Meta:
+        indexes = [
+            # Hospital dashboard's pending-donations list
+            models.Index(fields=['hospital', 'status'], name='donation_hospital_status_idx'),
+        ]
+
 class Badge(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField()
@@ -196,6 +330,48 @@ class BloodRequest(models.Model):
     def __str__(self):
         return f"{self.blood_group} request by {self.hospital.hospitalprofile.hospital_name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._demand_snapshot = instance.get_demand_key()
+        instance._counter_snapshot = instance.get_counter_values()
+        return instance
+
+    def get_counter_values(self):
+        """(hospital id, {counter: value}) this request contributes to HospitalAnalytics counters"""
+        return self.__dict__.get('hospital_id'), {
+            'total_requests': 1,
+            'active_requests': int(bool(self.__dict__.get('is_active'))),
+            'fulfilled_requests': int(self.__dict__.get('status') == 'Fulfilled'),
+        }
+
+    def get_demand_key(self):
+        """(hospital, blood group, day, units) this request contributes to DailyBloodDemand"""
+        if not self.created_at or self.units_required is None:
+            return None
+        return (self.hospital_id, self.blood_group, timezone.localdate(self.created_at), self.units_required)
+
+    def save(self, *args, **kwargs):
+        """Save and move this request's units between DailyBloodDemand rows in one transaction"""
+        previous = getattr(self, '_demand_snapshot', None)
+        previous_counters = getattr(self, '_counter_snapshot', None)
+        counters = self.get_counter_values()
+        with transaction.atomic():
+            # Counters first: the post_save receivers may create the hospital's analytics row
+            if counters != previous_counters:
+                adjust_hospital_counters(previous_counters, counters)
+            super().save(*args, **kwargs)
+            current = self.get_demand_key()
+            if current != previous:
+                if previous:
+                    DailyBloodDemand.record(*previous[:3], units=-previous[3], requests=-1)
+                    if previous[0] != self.hospital_id:
+                        invalidate_demand_forecast(previous[0])
+                if current:
+                    DailyBloodDemand.record(*current[:3], units=current[3], requests=1)
+        self._demand_snapshot = current
+        self._counter_snapshot = counters
+
     def update_fulfillment(self):
         """Update fulfillment percentage based on confirmed donations"""
         confirmed_donations = self.donations.filter(status=Donation.DonationStatus.CONFIRMED)
@@ -211,6 +387,56 @@ class BloodRequest(models.Model):
         
         self.save()
 
+    class Meta:
+        indexes = [
+            # Donor request lists: open requests of one group, most urgent and newest first
+            models.Index(fields=['blood_group', 'urgency', '-created_at', 'expires_on'], name='bloodrequest_open_group_idx',
+                         condition=models.Q(is_active=True)),
+            # Hospital dashboards: the hospital's open requests, newest first
+            models.Index(fields=['hospital', '-created_at'], name='bloodrequest_hospital_open_idx',
+                         condition=models.Q(is_active=True)),
+            # Demand history per hospital and group
+            models.Index(fields=['hospital', 'blood_group', 'created_at'], name='bloodrequest_demand_idx'),
+            models.Index(fields=['created_at'], name='bloodrequest_created_idx'),
+            # Batch matcher and site-wide open-request count
+            models.Index(fields=['id'], name='bloodrequest_active_idx', condition=models.Q(is_active=True)),
+        ]
+
+class DailyBloodDemand(models.Model):
+    """Units requested per hospital, blood group and day (rollup of BloodRequest)"""
+    hospital = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='daily_demand')
+    blood_group = models.CharField(max_length=3, choices=UserProfile.BloodGroup.choices)
+    date = models.DateField()
+    units_required = models.IntegerField(default=0)
+    request_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('hospital', 'blood_group', 'date')
+
+    def __str__(self):
+        return f"{self.hospital_id} - {self.blood_group} on {self.date}: {self.units_required} units"
+
+    @classmethod
+    def record(cls, hospital_id, blood_group, date, units, requests):
+        """Apply a units/request-count delta to one rollup row"""
+        rows = cls.objects.filter(hospital_id=hospital_id, blood_group=blood_group, date=date)
+        if requests < 0:
+            # Removals never create rows (the hospital itself may be mid-delete)
+            rows.update(
+                units_required=models.F('units_required') + units,
+                request_count=models.F('request_count') + requests
+            )
+            return
+        row, created = cls.objects.get_or_create(
+            hospital_id=hospital_id, blood_group=blood_group, date=date,
+            defaults={'units_required': units, 'request_count': requests}
+        )
+        if not created:
+            rows.update(
+                units_required=models.F('units_required') + units,
+                request_count=models.F('request_count') + requests
+            )
+
 class BloodCamp(models.Model):
     organized_by = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='camps')
     title = models.CharField(max_length=200)
@@ -267,17 +493,76 @@ class DonorAnalytics(models.Model):
     # Risk scores
     retention_risk_score = models.FloatField(default=0.0)
     churn_probability = models.FloatField(default=0.0)
+    retention_risk_factors = models.JSONField(default=list, blank=True)  # Reasons behind retention_risk_score
+    retention_scored_at = models.DateTimeField(null=True, blank=True)
+    
+    # Donation features (denormalized from Donation for matching and retention)
+    completed_donations = models.PositiveIntegerField(default=0)
+    first_donation_date = models.DateField(null=True, blank=True)
+    last_donation_date = models.DateField(null=True, blank=True)
+    responses_90d = models.PositiveIntegerField(default=0, help_text="Responses to requests in the last 90 days")
+    responses_180d = models.PositiveIntegerField(default=0, help_text="Responses to requests in the last 180 days")
+    features_updated_at = models.DateTimeField(null=True, blank=True)
+    
+    # Write-behind refresh: set by mark_analytics_dirty, cleared by services.refresh_dirty_analytics
+    dirty_since = models.DateTimeField(null=True, blank=True)
+    computed_at = models.DateTimeField(null=True, blank=True)
     
     last_updated = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Keyset order of the retention dashboards (highest risk first)
+            models.Index(fields=['-retention_risk_score', 'donor'], name='donor_retention_rank_idx'),
+            models.Index(fields=['dirty_since'], name='donoranalytics_dirty_idx',
+                         condition=models.Q(dirty_since__isnull=False)),
+        ]
+    
     def __str__(self):
         return f"Analytics for {self.donor.username}"
+    
+    @staticmethod
+    def donation_feature_aggregates(now=None):
+        """Aggregate expressions used to build the donation feature columns"""
+        now = now or timezone.now()
+        completed = models.Q(donations__status=Donation.DonationStatus.COMPLETED)
+        return {
+            'completed_count': models.Count('donations', filter=completed),
+            'first_date': models.Min('donations__donation_date', filter=completed),
+            'last_date': models.Max('donations__donation_date', filter=completed),
+            'recent_90d': models.Count('donations', filter=models.Q(donations__created_at__gte=now - timedelta(days=90))),
+            'recent_180d': models.Count('donations', filter=models.Q(donations__created_at__gte=now - timedelta(days=180))),
+        }
+    
+    def apply_donation_features(self, stats, now=None):
+        """Copy one row of donation_feature_aggregates onto this record"""
+        self.completed_donations = stats['completed_count']
+        self.first_donation_date = stats['first_date']
+        self.last_donation_date = stats['last_date']
+        self.responses_90d = stats['recent_90d']
+        self.responses_180d = stats['recent_180d']
+        self.features_updated_at = now or timezone.now()
+    
+    def refresh_features(self):
+        """Recompute the donation features for this donor with one aggregate query"""
+        now = timezone.now()
+        stats = CustomUser.objects.filter(pk=self.donor_id).aggregate(**self.donation_feature_aggregates(now))
+        self.apply_donation_features(stats, now)
+        self.save(update_fields=[
+            'completed_donations', 'first_donation_date', 'last_donation_date',
+            'responses_90d', 'responses_180d', 'features_updated_at', 'last_updated'
+        ])
 
 class HospitalAnalytics(models.Model):
     """Analytics data for hospitals"""
     hospital = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='hospital_analytics')
+    # Counter cache (COUNTER_FIELDS), kept in step by BloodRequest.save/Donation.save (see adjust_hospital_counters)
     total_requests = models.PositiveIntegerField(default=0)
+    active_requests = models.PositiveIntegerField(default=0)
     fulfilled_requests = models.PositiveIntegerField(default=0)
+    pending_donations = models.PositiveIntegerField(default=0)
+    confirmed_donations = models.PositiveIntegerField(default=0)
+    confirmed_units = models.PositiveIntegerField(default=0)
     fulfillment_rate = models.FloatField(default=0.0)
     avg_response_time = models.FloatField(default=0.0)
     total_donors_engaged = models.PositiveIntegerField(default=0)
@@ -286,10 +571,65 @@ class HospitalAnalytics(models.Model):
     # Blood group specific stats
     blood_group_stats = models.JSONField(default=dict)
     
+    # Write-behind refresh: set by mark_analytics_dirty, cleared by services.refresh_dirty_analytics
+    dirty_since = models.DateTimeField(null=True, blank=True)
+    computed_at = models.DateTimeField(null=True, blank=True)
+    
     last_updated = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['dirty_since'], name='hospitalanalytics_dirty_idx',
+                         condition=models.Q(dirty_since__isnull=False)),
+        ]
+    
+    COUNTER_FIELDS = (
+        'total_requests', 'active_requests', 'fulfilled_requests',
+        'pending_donations', 'confirmed_donations', 'confirmed_units'
+    )
+    
     def __str__(self):
         return f"Analytics for {self.hospital.hospitalprofile.hospital_name}"
+    
+    @classmethod
+    def count_counters(cls, hospital_id):
+        """COUNTER_FIELDS values recounted from the hospital's requests and donations"""
+        counters = BloodRequest.objects.filter(hospital_id=hospital_id).aggregate(
+            total_requests=models.Count('id'),
+            active_requests=models.Count('id', filter=models.Q(is_active=True)),
+            fulfilled_requests=models.Count('id', filter=models.Q(status='Fulfilled')),
+        )
+        confirmed = models.Q(status=Donation.DonationStatus.CONFIRMED)
+        counters.update(Donation.objects.filter(hospital_id=hospital_id).aggregate(
+            pending_donations=models.Count('id', filter=models.Q(status=Donation.DonationStatus.PENDING)),
+            confirmed_donations=models.Count('id', filter=confirmed),
+            confirmed_units=Coalesce(models.Sum('units', filter=confirmed), 0),
+        ))
+        return counters
+    
+    @classmethod
+    def get_or_create_counted(cls, hospital_id):
+        """(row, created) for a hospital; a missing row starts from recounted counters, not 0"""
+        row = cls.objects.filter(hospital_id=hospital_id).first()
+        if row is not None:
+            return row, False
+        return cls.objects.get_or_create(hospital_id=hospital_id, defaults=cls.count_counters(hospital_id))
+    
+    @classmethod
+    def recount(cls, hospital_id):
+        """Overwrite a row's counters with a recount, under the row lock so concurrent F() deltas land before or after it"""
+        with transaction.atomic():
+            if list(cls.objects.select_for_update().filter(hospital_id=hospital_id).values_list('pk', flat=True)):
+                cls.objects.filter(hospital_id=hospital_id).update(**cls.count_counters(hospital_id))
+    
+    def save(self, *args, **kwargs):
+        """Full saves of an existing row leave the counters alone (they only move by F() updates)"""
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
 
 class Notification(models.Model):
     class NotificationType(models.TextChoices):
@@ -310,9 +650,103 @@ class Notification(models.Model):
     
     class Meta: 
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', 'is_read', '-created_at'], name='notification_inbox_idx'),
+            models.Index(fields=['recipient', '-created_at', '-id'], name='notification_recipient_idx'),
+            models.Index(fields=['created_at'], name='notification_created_idx'),
+            # Donors already notified about a request (notification job retries and waves)
+            models.Index(fields=['related_object_id', 'related_content_type'], name='notification_related_idx'),
+        ]
     
-    def __str__(self): 
+    def __str__(self):
         return f"Notification for {self.recipient.username}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._was_read = instance.__dict__.get('is_read')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        """Save and move the recipient's unread counter when the notification is added or read/unread"""
+        was_unread = self._state.adding is False and getattr(self, '_was_read', None) is False
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if was_unread != (not self.is_read):
+                adjust_unread_notifications({self.recipient_id: 1 if not self.is_read else -1})
+        self._was_read = self.is_read
+    
+    @classmethod
+    def bulk_send(cls, notifications):
+        """bulk_create notifications and bump each recipient's unread counter (bulk_create skips save())"""
+        with transaction.atomic():
+            created = cls.objects.bulk_create(notifications)
+            deltas = {}
+            for notification in created:
+                if not notification.is_read:
+                    deltas[notification.recipient_id] = deltas.get(notification.recipient_id, 0) + 1
+            adjust_unread_notifications(deltas)
+        return created
+    
+    @classmethod
+    def mark_read(cls, recipient_id, ids=None):
+        """Mark a recipient's notifications (all, or only ids) read; returns the number changed"""
+        rows = cls.objects.filter(recipient_id=recipient_id, is_read=False)
+        if ids is not None:
+            rows = rows.filter(id__in=ids)
+        with transaction.atomic():
+            updated = rows.update(is_read=True)
+            adjust_unread_notifications({recipient_id: -updated})
+        return updated
+    
+    @classmethod
+    def delete_expired(cls, ids):
+        """Delete notifications by id, releasing unread counters with one UPDATE per distinct delta"""
+        rows = cls.objects.filter(id__in=ids)
+        with transaction.atomic():
+            unread = dict(
+                rows.filter(is_read=False).order_by().values_list('recipient_id').annotate(total=models.Count('id'))
+            )
+            adjust_unread_notifications({recipient_id: -total for recipient_id, total in unread.items()})
+            # Marked read first so the post_delete receiver has nothing left to release
+            rows.update(is_read=True)
+            deleted, _ = rows.delete()
+        return deleted
+
+class NotificationJob(models.Model):
+    """Queued match-and-notify run for a blood request (processed by run_notification_worker)"""
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        RUNNING = 'RUNNING', 'Running'
+        DONE = 'DONE', 'Done'
+        FAILED = 'FAILED', 'Failed'
+
+    blood_request = models.ForeignKey(BloodRequest, on_delete=models.CASCADE, related_name='notification_jobs')
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    wave = models.PositiveSmallIntegerField(default=0)  # Critical requests notify in expanding waves
+    run_after = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    donors_matched = models.PositiveIntegerField(default=0)
+    donors_notified = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'run_after'], name='notificationjob_queue_idx')]
+
+    def __str__(self):
+        return f"Notify job {self.id} for request {self.blood_request_id}, wave {self.wave} ({self.status})"
+
+class DonorMatchChange(models.Model):
+    """A donor whose matching inputs changed; the id is the change's sequence number"""
+    donor_id = models.BigIntegerField()  # No FK: the change must outlive a deleted donor
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"Match change {self.id} for donor {self.donor_id}"
 
 class AIPredictionLog(models.Model):
     class PredictionType(models.TextChoices):
@@ -326,7 +760,13 @@ class AIPredictionLog(models.Model):
     input_data = models.JSONField(null=True, blank=True)
     output_data = models.JSONField(null=True, blank=True)
     confidence_score = models.FloatField(default=0.0)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now)  # Set when logged, not when a buffered row is flushed
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['timestamp'], name='aipredictionlog_time_idx'),
+            models.Index(fields=['prediction_type', '-timestamp'], name='aipredictionlog_type_idx'),
+        ]
     
     def __str__(self): 
         return f"{self.get_prediction_type_display()} - {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
@@ -339,10 +779,13 @@ class ChatbotConversation(models.Model):
     bot_response = models.TextField()
     intent_detected = models.CharField(max_length=100, null=True, blank=True)
     confidence_score = models.FloatField(default=0.0)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now)  # Set when logged, not when a buffered row is flushed
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at'], name='chatbot_created_idx'),
+        ]
     
     def __str__(self):
         return f"Chat: {self.session_id} - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
@@ -380,10 +823,195 @@ class GlobalSetting(models.Model):
     def save(self, *args, **kwargs): 
         self.pk = 1
         super(GlobalSetting, self).save(*args, **kwargs)
+        bump_global_setting_version()
+    
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        bump_global_setting_version()
+        return result
     
     @classmethod
     def load(cls):
-        return cls.objects.get_or_create(pk=1)[0]
+        """
+        The settings row, cached per process. At most every
+        GLOBAL_SETTING_RECHECK_INTERVAL seconds the cached copy's version is
+        compared with the shared version key (bumped on save), so the row is
+        only read again after a change. Treat the result as read-only; edit a
+        fresh cls.objects.get(pk=1) instead.
+        """
+        cached = _global_setting_cache
+        now = time.monotonic()
+        if cached.get('instance') is not None and now < cached['recheck_at']:
+            return cached['instance']
+        
+        version = cache.get(GLOBAL_SETTING_VERSION_KEY)
+        if version is None:
+            cache.add(GLOBAL_SETTING_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+            version = cache.get(GLOBAL_SETTING_VERSION_KEY)
+        
+        if cached.get('version') != version or cached.get('instance') is None:
+            cached.update(version=version, instance=cls.objects.get_or_create(pk=1)[0])
+        cached['recheck_at'] = now + settings.HEMOVITAL_SETTINGS['GLOBAL_SETTING_RECHECK_INTERVAL']
+        return cached['instance']
+
+# Process-local copy of the GlobalSetting row, the version it was read at and
+# when to compare that version with the shared key again
+_global_setting_cache = {}
+
+GLOBAL_SETTING_VERSION_KEY = 'global_setting_version'
+
+def bump_global_setting_version():
+    """Make every process reload GlobalSetting once the transaction commits"""
+    def bump():
+        cache.set(GLOBAL_SETTING_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        _global_setting_cache.clear()
+    transaction.on_commit(bump)
+
+# ============================================================================ #
+# NOTIFICATION COUNTERS
+# ============================================================================ #
+
+def adjust_unread_notifications(deltas):
+    """Apply {recipient_id: delta} to unread counters with one UPDATE per distinct delta"""
+    by_delta = {}
+    for recipient_id, delta in deltas.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(recipient_id)
+    for delta, recipient_ids in by_delta.items():
+        CustomUser.objects.filter(id__in=recipient_ids).update(
+            unread_notification_count=Greatest(models.F('unread_notification_count') + delta, 0)
+        )
+
+# ============================================================================ #
+# HOSPITAL COUNTERS
+# ============================================================================ #
+
+def adjust_hospital_counters(previous, current, create_missing=True):
+    """
+    Move a row's contribution between HospitalAnalytics counters with F()
+    updates. previous/current are (hospital id, {counter: value}) or None.
+    Call it before the row itself is written: a hospital without an
+    analytics row gets one from a recount, which must not yet include this
+    change. Deletes pass create_missing=False (the hospital may be mid-delete).
+    """
+    deltas = {}
+    for contribution, sign in ((previous, -1), (current, 1)):
+        if contribution is None or contribution[0] is None:
+            continue
+        hospital_deltas = deltas.setdefault(contribution[0], {})
+        for field, value in contribution[1].items():
+            hospital_deltas[field] = hospital_deltas.get(field, 0) + sign * value
+    
+    for hospital_id, fields in deltas.items():
+        changes = {
+            field: Greatest(models.F(field) + delta, 0)
+            for field, delta in fields.items() if delta
+        }
+        if not changes or HospitalAnalytics.objects.filter(hospital_id=hospital_id).update(**changes):
+            continue
+        if create_missing:
+            HospitalAnalytics.get_or_create_counted(hospital_id)
+            HospitalAnalytics.objects.filter(hospital_id=hospital_id).update(**changes)
+
+# ============================================================================ #
+# ANALYTICS WRITE-BEHIND
+# ============================================================================ #
+# Events that change a user's analytics only flag the row; the
+# refresh_dirty_analytics command recomputes flagged rows in batches, at most
+# once per ANALYTICS_REFRESH_INTERVAL per user.
+
+def mark_analytics_dirty(donor_ids=(), hospital_ids=(), create_missing=True):
+    """
+    Flag donor/hospital analytics rows for recomputation (keeps the earliest
+    flag time). Users without a row get one, created dirty, unless
+    create_missing is False (deletes: the user itself may be mid-delete).
+    """
+    now = timezone.now()
+    donor_ids = {donor_id for donor_id in donor_ids if donor_id}
+    hospital_ids = {hospital_id for hospital_id in hospital_ids if hospital_id}
+    if donor_ids:
+        flagged = DonorAnalytics.objects.filter(donor_id__in=donor_ids, dirty_since__isnull=True).update(dirty_since=now)
+        if create_missing and flagged < len(donor_ids):
+            missing = donor_ids - set(DonorAnalytics.objects.filter(donor_id__in=donor_ids).values_list('donor_id', flat=True))
+            DonorAnalytics.objects.bulk_create(
+                [DonorAnalytics(donor_id=donor_id, dirty_since=now) for donor_id in missing], ignore_conflicts=True
+            )
+    if hospital_ids:
+        flagged = HospitalAnalytics.objects.filter(hospital_id__in=hospital_ids, dirty_since__isnull=True).update(dirty_since=now)
+        if create_missing and flagged < len(hospital_ids):
+            missing = hospital_ids - set(HospitalAnalytics.objects.filter(hospital_id__in=hospital_ids).values_list('hospital_id', flat=True))
+            # Zeroed counters: adjust_hospital_counters and the refresh own their values
+            HospitalAnalytics.objects.bulk_create(
+                [HospitalAnalytics(hospital_id=hospital_id, dirty_since=now) for hospital_id in missing], ignore_conflicts=True
+            )
+
+# ============================================================================ #
+# FORECAST CACHE VERSIONING
+# ============================================================================ #
+
+# Versions live in the shared cache, so a BloodRequest/BloodStock write in one
+# process retires the cached forecast for every process.
+
+def demand_forecast_version(hospital_id):
+    """Current cache version of a hospital's demand forecast"""
+    key = f'demand_forecast_version:{hospital_id}'
+    version = cache.get(key)
+    if version is None:
+        # Never a fixed default: an evicted version must not revive forecasts cached under it
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+        version = cache.get(key)
+    return version
+
+def invalidate_demand_forecast(hospital_id):
+    """Give the hospital's forecast a new cache version once the transaction commits"""
+    transaction.on_commit(
+        lambda: cache.set(f'demand_forecast_version:{hospital_id}', uuid.uuid4().hex, timeout=None)
+    )
+
+# ============================================================================ #
+# DONOR MATCH CHANGE LOG
+# ============================================================================ #
+# Cached match pools (services.get_cached_donor_matches) rescore only the
+# donors logged here since the pool was built. The log is a table rather than
+# cache entries so every process (web workers, run_notification_worker) sees
+# the same sequence; rows older than twice MATCH_CACHE_TTL are pruned, as no
+# live pool can be that far behind.
+
+# Pool variants cached per request besides the default one
+DONOR_MATCH_POOL_VARIANTS = ('', 'waves')
+
+# Prune the change log once every this many changes
+DONOR_MATCH_PRUNE_EVERY = 1000
+
+def donor_match_cache_key(request_id, variant=''):
+    """Cache key of a BloodRequest's donor pool rows ('waves': the wider critical-wave pool)"""
+    return f'donor_pool:{request_id}:{variant}' if variant else f'donor_pool:{request_id}'
+
+def current_donor_change_seq():
+    """Sequence number of the latest logged donor change"""
+    return DonorMatchChange.objects.aggregate(seq=models.Max('id'))['seq'] or 0
+
+def record_donor_match_change(donor_id):
+    """Log that a donor's matching inputs changed, once the transaction commits"""
+    def record():
+        change = DonorMatchChange.objects.create(donor_id=donor_id)
+        if change.id % DONOR_MATCH_PRUNE_EVERY == 0:
+            ttl = settings.HEMOVITAL_SETTINGS['MATCH_CACHE_TTL']
+            DonorMatchChange.objects.filter(created_at__lt=timezone.now() - timedelta(seconds=2 * ttl)).delete()
+    transaction.on_commit(record)
+
+def donor_changes_since(seq, max_changes=1000):
+    """
+    (latest seq, donor ids changed after seq), or None when too much changed
+    to be worth a partial rescore.
+    """
+    changes = list(
+        DonorMatchChange.objects.filter(id__gt=seq).order_by('id').values_list('id', 'donor_id')[:max_changes + 1]
+    )
+    if len(changes) > max_changes:
+        return None
+    latest = changes[-1][0] if changes else seq
+    return latest, {donor_id for _, donor_id in changes}
 
 # ============================================================================ #
 # SIGNALS
@@ -415,12 +1043,77 @@ def update_donation_analytics(sender, instance, created, **kwargs):
         donor_analytics, _ = DonorAnalytics.objects.get_or_create(donor=instance.donor)
         donor_analytics.total_notifications += 1
         donor_analytics.save()
-        
-        # Update hospital analytics if linked to blood request
-        if instance.blood_request:
-            hospital_analytics, _ = HospitalAnalytics.objects.get_or_create(hospital=instance.blood_request.hospital)
-            hospital_analytics.fulfilled_requests += 1
-            hospital_analytics.save()
+        # Hospital counters move in Donation.save/BloodRequest.save (adjust_hospital_counters)
+
+@receiver(post_save, sender=Donation)
+def refresh_donor_features(sender, instance, **kwargs):
+    """Keep the donor's denormalized donation features in step with Donation"""
+    donor_analytics, _ = DonorAnalytics.objects.get_or_create(donor_id=instance.donor_id)
+    donor_analytics.refresh_features()
+    record_donor_match_change(instance.donor_id)
+
+@receiver(post_delete, sender=Donation)
+def refresh_donor_features_on_delete(sender, instance, **kwargs):
+    """Refresh donation features after a donation is removed"""
+    donor_analytics = DonorAnalytics.objects.filter(donor_id=instance.donor_id).first()
+    if donor_analytics:
+        donor_analytics.refresh_features()
+    record_donor_match_change(instance.donor_id)
+
+@receiver(post_delete, sender=BloodRequest)
+def remove_request_demand(sender, instance, **kwargs):
+    """Take a deleted request's units out of DailyBloodDemand"""
+    previous = getattr(instance, '_demand_snapshot', None) or instance.get_demand_key()
+    if previous:
+        DailyBloodDemand.record(*previous[:3], units=-previous[3], requests=-1)
+
+@receiver(post_save, sender=BloodRequest)
+@receiver(post_delete, sender=BloodRequest)
+@receiver(post_save, sender=BloodStock)
+@receiver(post_delete, sender=BloodStock)
+def invalidate_forecast_inputs(sender, instance, **kwargs):
+    """Demand or stock changed, so the hospital's cached forecast is stale"""
+    invalidate_demand_forecast(instance.hospital_id)
+
+@receiver(post_save, sender=Donation)
+@receiver(post_delete, sender=Donation)
+def mark_donation_analytics_dirty(sender, instance, **kwargs):
+    """A donation moves its donor's engagement and its hospital's fulfillment"""
+    mark_analytics_dirty(
+        donor_ids=[instance.donor_id], hospital_ids=[instance.hospital_id], create_missing=kwargs['signal'] is post_save
+    )
+
+@receiver(post_delete, sender=BloodRequest)
+def release_request_counters(sender, instance, **kwargs):
+    """A deleted request leaves its hospital's request counters"""
+    adjust_hospital_counters(getattr(instance, '_counter_snapshot', None) or instance.get_counter_values(), None, create_missing=False)
+
+@receiver(post_delete, sender=Donation)
+def release_donation_counters(sender, instance, **kwargs):
+    """A deleted donation leaves its hospital's donation counters"""
+    key = getattr(instance, '_counter_snapshot', None) or instance.get_counter_key()
+    adjust_hospital_counters(instance.get_counter_values(key), None, create_missing=False)
+
+@receiver(post_save, sender=BloodRequest)
+@receiver(post_delete, sender=BloodRequest)
+def mark_request_analytics_dirty(sender, instance, **kwargs):
+    """Request counts and fulfillment rate are per hospital"""
+    mark_analytics_dirty(hospital_ids=[instance.hospital_id], create_missing=kwargs['signal'] is post_save)
+
+@receiver(post_delete, sender=Notification)
+def release_unread_notification(sender, instance, **kwargs):
+    """Deleting an unread notification takes it off the recipient's counter"""
+    if not instance.is_read:
+        adjust_unread_notifications({instance.recipient_id: -1})
+
+@receiver(post_save, sender=BloodRequest)
+@receiver(post_delete, sender=BloodRequest)
+def invalidate_request_matches(sender, instance, **kwargs):
+    """The request itself changed (group, urgency, status), so rescore its pool"""
+    request_id = instance.id
+    transaction.on_commit(lambda: cache.delete_many(
+        [donor_match_cache_key(request_id, variant) for variant in DONOR_MATCH_POOL_VARIANTS]
+    ))
 
 # ============================================================================ #
 # 7. PASSWORD RESET & AUTH MODELS
@@ -5,100 +5,122 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from django.db.models import Count, Sum, Avg, Q
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import StandardScaler
-import joblib
+from django.db.models import Count, Sum, Avg, Q, F
+from django.db.models.functions import TruncDate
 import os
+import gzip
+import json
+import random
 from django.utils import timezone
+from django.db import connection, transaction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from concurrent.futures import ProcessPoolExecutor
 
 # Import models
 from .models import (
     CustomUser, UserProfile, HospitalProfile, Donation, 
-    BloodRequest, BloodStock, AIPredictionLog, DonorAnalytics,
-    HospitalAnalytics, GlobalSetting
+    BloodRequest, BloodStock, AIPredictionLog, ChatbotConversation, DonorAnalytics,
+    HospitalAnalytics, GlobalSetting, DailyBloodDemand, PincodeLocation, Notification, NotificationJob,
+    demand_forecast_version, donor_match_cache_key, current_donor_change_seq, donor_changes_since
 )
+from .forecasting import (
+    predict_using_linear_regression, predict_using_moving_average,
+    predict_using_seasonal_patterns, calculate_prediction_confidence,
+    get_demand_trend, recommend_stock_level, forecast_series, forecast_hospital_chunk
+)
+from .geo import grid_cell, grid_cell_ranges, haversine_km
+from .log_buffer import log_writer
 
 # ============================================================================ #
 # 1. BLOOD COMPATIBILITY SERVICE
 # ============================================================================ #
 
+# Donor/recipient score matrix, built once: COMPATIBILITY_SCORES[donor, recipient]
+BLOOD_GROUPS = ['O+', 'O-', 'A+', 'A-', 'B+', 'B-', 'AB+', 'AB-']
+BLOOD_GROUP_INDEX = {blood_group: index for index, blood_group in enumerate(BLOOD_GROUPS)}
+
+COMPATIBILITY_SCORES = np.array([
+    #  O+  O-  A+  A-  B+  B- AB+ AB-   (recipient)
+    [30, 15, 25, 10, 25, 10, 20,  5],  # O+
+    [25, 30, 10, 20, 10, 20,  5, 15],  # O-
+    [10,  5, 30, 20,  0,  0, 25, 15],  # A+
+    [ 5, 10, 25, 30,  0,  0, 15, 20],  # A-
+    [10,  5,  0,  0, 30, 20, 25, 15],  # B+
+    [ 5, 10,  0,  0, 25, 30, 15, 20],  # B-
+    [10,  5, 20, 15, 20, 15, 30, 25],  # AB+
+    [ 5, 10, 15, 20, 15, 20, 25, 30],  # AB-
+], dtype=np.int64)
+
+# Donor group -> recipient groups it scores for, and the reverse for SQL pre-filtering
+DONOR_RECIPIENT_GROUPS = {
+    donor: [BLOOD_GROUPS[index] for index in np.flatnonzero(COMPATIBILITY_SCORES[row])]
+    for row, donor in enumerate(BLOOD_GROUPS)
+}
+COMPATIBLE_DONOR_GROUPS = {
+    recipient: [BLOOD_GROUPS[index] for index in np.flatnonzero(COMPATIBILITY_SCORES[:, column])]
+    for column, recipient in enumerate(BLOOD_GROUPS)
+}
+
 def calculate_blood_compatibility_score(donor_blood_group, required_blood_group):
     """
     Calculate blood compatibility score based on medical compatibility rules
     Returns score between 0-30
     """
-    compatibility_matrix = {
-        'O+': {'O+': 30, 'A+': 25, 'B+': 25, 'AB+': 20, 'O-': 15, 'A-': 10, 'B-': 10, 'AB-': 5},
-        'O-': {'O-': 30, 'O+': 25, 'A-': 20, 'B-': 20, 'AB-': 15, 'A+': 10, 'B+': 10, 'AB+': 5},
-        'A+': {'A+': 30, 'AB+': 25, 'A-': 20, 'AB-': 15, 'O+': 10, 'O-': 5},
-        'A-': {'A-': 30, 'A+': 25, 'AB-': 20, 'AB+': 15, 'O-': 10, 'O+': 5},
-        'B+': {'B+': 30, 'AB+': 25, 'B-': 20, 'AB-': 15, 'O+': 10, 'O-': 5},
-        'B-': {'B-': 30, 'B+': 25, 'AB-': 20, 'AB+': 15, 'O-': 10, 'O+': 5},
-        'AB+': {'AB+': 30, 'AB-': 25, 'A+': 20, 'B+': 20, 'A-': 15, 'B-': 15, 'O+': 10, 'O-': 5},
-        'AB-': {'AB-': 30, 'AB+': 25, 'A-': 20, 'B-': 20, 'A+': 15, 'B+': 15, 'O-': 10, 'O+': 5}
-    }
-    
-    if donor_blood_group in compatibility_matrix and required_blood_group in compatibility_matrix[donor_blood_group]:
-        return compatibility_matrix[donor_blood_group][required_blood_group]
+    if donor_blood_group in BLOOD_GROUP_INDEX and required_blood_group in BLOOD_GROUP_INDEX:
+        return int(COMPATIBILITY_SCORES[BLOOD_GROUP_INDEX[donor_blood_group], BLOOD_GROUP_INDEX[required_blood_group]])
     return 0
 
+def blood_group_indices(blood_groups):
+    """Row index in COMPATIBILITY_SCORES for each blood group (-1 when unknown)"""
+    return np.array([BLOOD_GROUP_INDEX.get(group, -1) for group in blood_groups], dtype=np.int64)
+
 # ============================================================================ #
 # 2. INTELLIGENT DONOR MATCHING (ENHANCED)
 # ============================================================================ #
 
 def advanced_donor_matching(blood_request, top_n=15):
     """
-    Advanced AI-powered donor matching with multiple factors
+    Advanced AI-powered donor matching with multiple factors.
+    Scores the whole candidate pool at once with the batch engine below.
     """
-    hospital = blood_request.hospital
-    required_blood = blood_request.blood_group
-    urgency = blood_request.urgency
+    pool = score_match_pool(build_match_pool(blood_request), blood_request)
+    return rank_match_pool(pool, blood_request, top_n, log=True)
+
+def rank_match_pool(pool, blood_request, top_n=15, log=False):
+    """Top matches of a scored pool (see score_match_pool), optionally logged"""
+    # Keep qualified donors and select only the best top_n (ties keep pool order)
+    qualified = np.flatnonzero(pool['total'] >= 40)  # Minimum threshold
+    rounded_scores = np.round(pool['total'][qualified], 1)
+    top = select_top_k(rounded_scores, max(top_n, 5))
     
-    # Get potential donors with same blood group
-    potential_donors = CustomUser.objects.filter(
-        role=CustomUser.Role.DONOR,
-        userprofile__is_available=True,
-        userprofile__blood_group__isnull=False
-    ).select_related('userprofile')
+    # Enrich (donor rows, reasons, distance) only the selected donors
+    scored_donors = build_match_results(pool, pool, qualified[top[:top_n]], blood_request)
     
-    scored_donors = []
+    if log:
+        # Log AI prediction
+        log_ai_prediction(**build_donor_match_log(blood_request, len(pool['ids']), rounded_scores, top))
     
-    for donor in potential_donors:
-        # Calculate comprehensive score
-        score = calculate_comprehensive_score(donor, blood_request)
-        
-        if score >= 40:  # Minimum threshold
-            scored_donors.append({
-                'donor': donor,
-                'score': round(score, 1),
-                'match_level': get_match_level(score),
-                'reasons': get_match_reasons(donor, blood_request, score),
-                'distance': calculate_advanced_location_score(donor.userprofile, hospital.hospitalprofile),
-                'last_donation': donor.userprofile.last_donation_date
-            })
-    
-    # Sort by score and return top N
-    scored_donors.sort(key=lambda x: x['score'], reverse=True)
-    
-    # Log AI prediction
-    log_ai_prediction(
-        prediction_type='DONOR_MATCH',
-        user=hospital,
-        input_data={
+    return scored_donors
+
+def build_donor_match_log(blood_request, pool_size, rounded_scores, top):
+    """Keyword arguments for the DONOR_MATCH log of one ranked pool"""
+    return {
+        'prediction_type': 'DONOR_MATCH',
+        'user': blood_request.hospital,
+        'input_data': {
             'blood_request_id': blood_request.id,
-            'required_blood': required_blood,
-            'urgency': urgency,
-            'total_potential_donors': len(potential_donors),
-            'qualified_donors': len(scored_donors)
+            'required_blood': blood_request.blood_group,
+            'urgency': blood_request.urgency,
+            'total_potential_donors': pool_size,
+            'qualified_donors': len(rounded_scores)
         },
-        output_data={
-            'top_scores': [d['score'] for d in scored_donors[:5]],
-            'average_score': np.mean([d['score'] for d in scored_donors]) if scored_donors else 0
+        'output_data': {
+            'top_scores': [float(score) for score in rounded_scores[top[:5]]],
+            'average_score': float(np.mean(rounded_scores)) if len(rounded_scores) else 0
         }
-    )
-    
-    return scored_donors[:top_n]
+    }
 
 def calculate_comprehensive_score(donor, blood_request):
     """Calculate comprehensive matching score (0-100)"""
@@ -129,10 +151,19 @@ def calculate_comprehensive_score(donor, blood_request):
     
     return min(total_score, 100)
 
-def calculate_advanced_location_score(donor_profile, hospital_profile):
+def calculate_advanced_location_score(donor_profile, hospital_profile, search_radius_km=None):
     """Advanced location scoring with multiple factors"""
     score = 0
     
+    # Real distance when both sides are geocoded
+    if None not in (donor_profile.latitude, donor_profile.longitude,
+                    hospital_profile.latitude, hospital_profile.longitude):
+        if search_radius_km is None:
+            search_radius_km = GlobalSetting.load().default_search_radius_km
+        distance = float(haversine_km(hospital_profile.latitude, hospital_profile.longitude,
+                                      donor_profile.latitude, donor_profile.longitude))
+        return float(calculate_distance_score(distance, donor_profile.availability_radius or 0, search_radius_km))
+    
     # City match (basic)
     if donor_profile.city and hospital_profile.city:
         if donor_profile.city.lower() == hospital_profile.city.lower():
@@ -148,15 +179,28 @@ def calculate_advanced_location_score(donor_profile, hospital_profile):
     
     return score
 
+def calculate_distance_score(distance_km, availability_radius, search_radius_km):
+    """
+    Location score from a real distance (25 points): up to 15 for proximity
+    within the search radius, 10 when the donor is willing to travel that far.
+    Works on scalars and arrays.
+    """
+    proximity = 15 * np.clip(1 - distance_km / max(search_radius_km, 1), 0, 1)
+    return proximity + np.where(distance_km <= availability_radius, 10, 0)
+
+def get_donor_features(donor):
+    """Get the donor's precomputed donation features (empty if not yet built)"""
+    analytics = getattr(donor, 'analytics', None)
+    return analytics if analytics is not None else DonorAnalytics(donor=donor)
+
 def calculate_donation_history_score(donor):
     """Score based on comprehensive donation history"""
-    donations = Donation.objects.filter(donor=donor)
-    completed_donations = donations.filter(status=Donation.DonationStatus.COMPLETED)
+    features = get_donor_features(donor)
     
     score = 0
     
     # Number of donations
-    donation_count = completed_donations.count()
+    donation_count = features.completed_donations
     if donation_count >= 10:
         score += 10
     elif donation_count >= 5:
@@ -167,18 +211,17 @@ def calculate_donation_history_score(donor):
         score += 3
     
     # Recency of donation
-    last_donation = completed_donations.order_by('-donation_date').first()
-    if last_donation:
-        days_since_last = (timezone.now().date() - last_donation.donation_date).days
+    last_donation_date = features.last_donation_date
+    if last_donation_date:
+        days_since_last = (timezone.now().date() - last_donation_date).days
         if days_since_last <= 90:
             score += 5  # Recently donated - experienced
         elif days_since_last <= 180:
             score += 3  # Moderately recent
     
     # Consistency (donations per year)
-    if donation_count > 0 and last_donation:
-        first_donation = completed_donations.order_by('donation_date').first()
-        days_active = (last_donation.donation_date - first_donation.donation_date).days
+    if donation_count > 0 and last_donation_date:
+        days_active = (last_donation_date - features.first_donation_date).days
         if days_active > 0:
             donations_per_year = (donation_count / days_active) * 365
             if donations_per_year >= 2:
@@ -193,10 +236,7 @@ def calculate_response_behavior_score(donor):
         created_at__gte=timezone.now() - timedelta(days=180)  # Last 6 months
     ).count()
     
-    donor_responses = Donation.objects.filter(
-        donor=donor,
-        created_at__gte=timezone.now() - timedelta(days=180)
-    ).count()
+    donor_responses = get_donor_features(donor).responses_180d
     
     if total_blood_requests > 0:
         response_rate = (donor_responses / total_blood_requests) * 100
@@ -249,7 +289,7 @@ def get_match_reasons(donor, blood_request, score):
         reasons.append("Same city")
     
     # Experience
-    donations_count = Donation.objects.filter(donor=donor, status=Donation.DonationStatus.COMPLETED).count()
+    donations_count = get_donor_features(donor).completed_donations
     if donations_count >= 3:
         reasons.append(f"Experienced donor ({donations_count} donations)")
     
@@ -261,9 +301,627 @@ def get_match_reasons(donor, blood_request, score):
 
 def find_matching_donors(blood_request):
     """Find matching donors for blood request (legacy compatibility)"""
-    matches = advanced_donor_matching(blood_request, top_n=10)
+    matches = get_cached_donor_matches(blood_request, top_n=10)
     return [match['donor'] for match in matches]
 
+# ============================================================================ #
+# 2.1 BATCH SCORING ENGINE
+# ============================================================================ #
+
+def load_candidate_features(hospital_profile=None, search_radius_km=None, blood_groups=None, donor_ids=None,
+                            group_requests=True):
+    """
+    Load matching features for every available donor as NumPy arrays.
+    Uses two queries regardless of pool size: donor profiles joined with
+    their DonorAnalytics feature columns, and 180-day request counts per
+    blood group (skipped with group_requests=False, which leaves
+    group_requests_180d at 0 for set_group_request_counts).
+    
+    With a geocoded hospital and a search radius, only donors in the grid
+    cells around the hospital (plus same-city donors without coordinates)
+    are loaded, and those beyond the radius are dropped. blood_groups
+    restricts the pool to compatible donor groups in SQL, donor_ids to
+    specific donors (for partial rescoring).
+    """
+    donors = UserProfile.objects.filter(
+        user__role=CustomUser.Role.DONOR,
+        is_available=True,
+        blood_group__isnull=False
+    )
+    if blood_groups is not None:
+        donors = donors.filter(blood_group__in=blood_groups)
+    if donor_ids is not None:
+        donors = donors.filter(user_id__in=donor_ids)
+    area = get_search_area(hospital_profile, search_radius_km)
+    if area:
+        donors = donors.filter(area)
+    
+    profiles = list(
+        donors.order_by('user_id').values_list(
+            'user_id', 'blood_group', 'city', 'state', 'availability_radius',
+            'user__analytics__completed_donations', 'user__analytics__first_donation_date',
+            'user__analytics__last_donation_date', 'user__analytics__responses_180d',
+            'latitude', 'longitude'
+        )
+    )
+    
+    count = len(profiles)
+    ids = np.fromiter((row[0] for row in profiles), dtype=np.int64, count=count)
+    features = {
+        'ids': ids,
+        'blood_group': np.array([row[1] for row in profiles], dtype=object),
+        'blood_group_index': blood_group_indices(row[1] for row in profiles),
+        'city': np.array([(row[2] or '').lower() for row in profiles], dtype=object),
+        'state': np.array([(row[3] or '').lower() for row in profiles], dtype=object),
+        'radius': np.array([row[4] or 0 for row in profiles], dtype=float),
+        'completed_donations': np.array([row[5] or 0 for row in profiles], dtype=np.int64),
+        'first_donation': np.array([row[6].toordinal() if row[6] else -1 for row in profiles], dtype=np.int64),
+        'last_donation': np.array([row[7].toordinal() if row[7] else -1 for row in profiles], dtype=np.int64),
+        'responses_180d': np.array([row[8] or 0 for row in profiles], dtype=np.int64),
+        'latitude': np.array([row[9] if row[9] is not None else np.nan for row in profiles], dtype=float),
+        'longitude': np.array([row[10] if row[10] is not None else np.nan for row in profiles], dtype=float),
+        'group_requests_180d': np.zeros(count, dtype=np.int64),
+    }
+    if area:
+        # Grid cells cover a bounding box; keep donors actually inside the circle
+        distance = haversine_km(hospital_profile.latitude, hospital_profile.longitude,
+                                features['latitude'], features['longitude'])
+        in_range = np.isnan(distance) | (distance <= search_radius_km)
+        features = {key: values[in_range] for key, values in features.items()}
+        count = len(features['ids'])
+    if not count or not group_requests:
+        return features
+    
+    return set_group_request_counts(features, get_group_request_counts(days=180))
+
+def set_group_request_counts(features, group_requests):
+    """Fill features['group_requests_180d'] from get_group_request_counts(days=180)"""
+    group_totals = np.array([group_requests.get(blood_group, 0) for blood_group in BLOOD_GROUPS], dtype=np.int64)
+    counts = np.zeros(len(features['ids']), dtype=np.int64)
+    known = features['blood_group_index'] >= 0
+    counts[known] = group_totals[features['blood_group_index'][known]]
+    features['group_requests_180d'] = counts
+    return features
+
+def get_search_area(hospital_profile, search_radius_km):
+    """
+    Q for donors around a geocoded hospital: grid cells of the radius'
+    bounding box, or same-city donors without coordinates. None when the
+    hospital has no coordinates (search the whole pool).
+    """
+    if not hospital_profile or not search_radius_km or hospital_profile.latitude is None:
+        return None
+    
+    rows, columns = grid_cell_ranges(hospital_profile.latitude, hospital_profile.longitude, search_radius_km)
+    area = Q(grid_row__range=rows, grid_column__range=columns)
+    if hospital_profile.city:
+        area |= Q(latitude__isnull=True, city__iexact=hospital_profile.city)
+    return area
+
+def get_group_request_counts(days):
+    """BloodRequest counts per blood group over the last `days` days (one GROUP BY query)"""
+    cutoff = timezone.now() - timedelta(days=days)
+    return dict(
+        BloodRequest.objects.filter(created_at__gte=cutoff)
+        .values_list('blood_group')
+        .annotate(total=Count('id'))
+    )
+
+def score_candidates(features, blood_request, search_radius_km=None):
+    """
+    Compute all five score components for a candidate pool as array operations.
+    Mirrors calculate_comprehensive_score, one array element per donor.
+    """
+    scores = score_candidate_matrix(features, [blood_request], search_radius_km)
+    return {key: values[0] if np.ndim(values) else values for key, values in scores.items()}
+
+def score_candidate_matrix(features, blood_requests, search_radius_km=None):
+    """
+    Score a donor pool against several requests at once. Request-dependent
+    components (compatibility, location, urgency) and the total are
+    (requests x donors) matrices; donor-only components are shared rows.
+    """
+    hospital_profiles = [blood_request.hospital.hospitalprofile for blood_request in blood_requests]
+    if search_radius_km is None:
+        search_radius_km = GlobalSetting.load().default_search_radius_km
+    today = timezone.now().date().toordinal()
+    donor_count = len(features['ids'])
+    
+    # 1. Blood Compatibility (30 points): one gather from the score matrix
+    recipients = np.array([BLOOD_GROUP_INDEX.get(r.blood_group, -1) for r in blood_requests], dtype=np.int64)
+    donor_groups = features['blood_group_index']
+    compatibility = np.where(
+        (recipients[:, None] >= 0) & (donor_groups >= 0),
+        COMPATIBILITY_SCORES[donor_groups[None, :], recipients[:, None]],
+        0
+    ).astype(float)
+    
+    # 2. Location Proximity (25 points)
+    hospital_city = np.array([(profile.city or '').lower() for profile in hospital_profiles], dtype=object)[:, None]
+    hospital_state = np.array([(profile.state or '').lower() for profile in hospital_profiles], dtype=object)[:, None]
+    has_city = (features['city'] != '') & (hospital_city != '')
+    same_city = has_city & (features['city'] == hospital_city)
+    same_state = has_city & (features['state'] != '') & (hospital_state != '') & (features['state'] == hospital_state)
+    location = np.where(same_city, 15, np.where(same_state, 10, 0)) + np.minimum(10, features['radius'] / 2)
+    
+    # Geocoded donors and hospital: score the real haversine distance instead
+    hospital_lat, hospital_lng = (
+        np.array([np.nan if profile.latitude is None or profile.longitude is None else getattr(profile, field)
+                  for profile in hospital_profiles], dtype=float)[:, None]
+        for field in ('latitude', 'longitude')
+    )
+    distance = haversine_km(hospital_lat, hospital_lng, features['latitude'], features['longitude'])
+    distance = np.broadcast_to(distance, (len(blood_requests), donor_count))
+    located = ~np.isnan(distance)
+    location = np.where(
+        located, calculate_distance_score(distance, features['radius'], search_radius_km), location
+    )
+    
+    # 3. Donation History & Eligibility (20 points)
+    history = score_donation_history(features, today)
+    
+    # 4. Response Behavior (15 points)
+    response = score_response_behavior(features)
+    
+    # 5. Urgency Multiplier (10 points)
+    urgency = np.array([calculate_urgency_score(r.urgency) for r in blood_requests])[:, None]
+    
+    total = np.minimum(compatibility + location + history + response + urgency, 100)
+    
+    return {
+        'compatibility': compatibility,
+        'location': location,
+        'history': np.broadcast_to(history, total.shape),
+        'response': np.broadcast_to(response, total.shape),
+        'urgency': urgency[:, 0],
+        'total': total,
+        'distance_km': distance,
+    }
+
+def score_donation_history(features, today):
+    """Donation History & Eligibility component (20 points) per donor; today is a date ordinal"""
+    donation_count = features['completed_donations']
+    has_donated = features['last_donation'] >= 0
+    history = np.select(
+        [donation_count >= 10, donation_count >= 5, donation_count >= 2, donation_count >= 1],
+        [10, 8, 5, 3],
+        default=0
+    )
+    days_since_last = today - features['last_donation']
+    history += np.where(has_donated & (days_since_last <= 90), 5, np.where(has_donated & (days_since_last <= 180), 3, 0))
+    days_active = features['last_donation'] - features['first_donation']
+    regular = has_donated & (donation_count > 0) & (days_active > 0)
+    donations_per_year = np.divide(donation_count, days_active, out=np.zeros(len(days_active)), where=regular) * 365
+    history += np.where(regular & (donations_per_year >= 2), 5, 0)
+    history = np.minimum(history, 20)
+    return history
+
+def score_response_behavior(features):
+    """Response Behavior component (15 points) per donor, against its group's 180-day request count"""
+    total_requests = features['group_requests_180d']
+    response_rate = np.divide(
+        features['responses_180d'] * 100, total_requests,
+        out=np.zeros(len(total_requests)), where=total_requests > 0
+    )
+    return np.select(
+        [response_rate >= 80, response_rate >= 60, response_rate >= 40, response_rate >= 20],
+        [15, 12, 8, 5],
+        default=3
+    )
+
+def select_top_k(values, k):
+    """
+    Indices of the k largest values, best first, with ties in array order
+    (the same result as a stable descending sort). argpartition finds the
+    k-th value in linear time, so only values tied with or above it are sorted.
+    """
+    if k <= 0 or not len(values):
+        return np.zeros(0, dtype=np.int64)
+    
+    candidates = np.arange(len(values))
+    if len(values) > k:
+        kth = len(values) - k
+        kth_value = values[np.argpartition(values, kth)[kth]]
+        candidates = np.flatnonzero(values >= kth_value)
+    
+    order = np.argsort(-values[candidates], kind='stable')
+    return candidates[order[:k]]
+
+def build_match_results(features, scores, indices, blood_request, donors=None):
+    """
+    Build the matching result dicts for the selected candidate indices.
+    donors ({id: CustomUser} with userprofile) skips the lookup query.
+    """
+    selected_ids = [int(features['ids'][index]) for index in indices]
+    if donors is None:
+        donors = CustomUser.objects.select_related('userprofile').in_bulk(selected_ids)
+    hospital_city = (blood_request.hospital.hospitalprofile.city or '').lower()
+    
+    results = []
+    for index, donor_id in zip(indices, selected_ids):
+        donor = donors[donor_id]
+        profile = donor.userprofile
+        score = float(scores['total'][index])
+        
+        reasons = []
+        if scores['compatibility'][index] > 0:
+            reasons.append("Blood group compatible")
+        if profile.city and profile.city.lower() == hospital_city:
+            reasons.append("Same city")
+        donations_count = int(features['completed_donations'][index])
+        if donations_count >= 3:
+            reasons.append(f"Experienced donor ({donations_count} donations)")
+        if profile.is_available:
+            reasons.append("Currently available")
+        
+        results.append({
+            'donor': donor,
+            'score': round(score, 1),
+            'match_level': get_match_level(score),
+            'reasons': reasons[:3],
+            'distance': round(float(scores['distance_km'][index]), 1) if not np.isnan(scores['distance_km'][index]) else None,
+            'last_donation': profile.last_donation_date
+        })
+    
+    return results
+
+# ============================================================================ #
+# 2.2 MATCH POOL CACHE
+# ============================================================================ #
+
+# Pools cache only per-donor rows: the request-dependent score components
+# plus the inputs of the history and response components, which move with
+# the date and the 180-day demand counts and so are scored on every read.
+
+MATCH_POOL_FEATURES = {
+    'completed_donations': np.int32, 'first_donation': np.int32, 'last_donation': np.int32,
+    'responses_180d': np.int32, 'blood_group_index': np.int8,
+}
+
+def build_match_pool(blood_request, donor_ids=None, search_radius_km=None):
+    """
+    A request's candidate pool as compact per-donor rows: ids, the
+    compatibility, location and distance_km scored against the request,
+    and the MATCH_POOL_FEATURES score_match_pool reads.
+    """
+    hospital_profile = blood_request.hospital.hospitalprofile
+    if search_radius_km is None:
+        search_radius_km = GlobalSetting.load().default_search_radius_km
+    features = load_candidate_features(
+        hospital_profile, search_radius_km,
+        blood_groups=COMPATIBLE_DONOR_GROUPS.get(blood_request.blood_group, []),
+        donor_ids=donor_ids, group_requests=False
+    )
+    scores = score_candidates(features, blood_request, search_radius_km)
+    
+    pool = {field: features[field].astype(dtype) for field, dtype in MATCH_POOL_FEATURES.items()}
+    pool.update({
+        'ids': features['ids'],
+        'compatibility': scores['compatibility'],
+        'location': scores['location'],
+        'distance_km': scores['distance_km'],
+    })
+    return pool
+
+def score_match_pool(pool, blood_request):
+    """The pool with its total scores, for today and the current 180-day demand counts"""
+    features = set_group_request_counts(dict(pool), get_group_request_counts(days=180))
+    history = score_donation_history(features, timezone.now().date().toordinal())
+    response = score_response_behavior(features)
+    urgency = calculate_urgency_score(blood_request.urgency)
+    
+    return dict(pool, total=np.minimum(pool['compatibility'] + pool['location'] + history + response + urgency, 100))
+
+def merge_match_pool(pool, rescored, donor_ids):
+    """Replace the rows of donor_ids in a pool with their rescored rows (kept in id order)"""
+    keep = ~np.isin(pool['ids'], list(donor_ids))
+    merged = {key: np.concatenate([values[keep], rescored[key]]) for key, values in pool.items()}
+    order = np.argsort(merged['ids'], kind='stable')
+    return {key: values[order] for key, values in merged.items()}
+
+def get_cached_donor_matches(blood_request, top_n=15):
+    """
+    Ranked matches for an active request from its cached donor pool.
+    The pool is scored (and logged) once; afterwards only donors whose
+    profile or donations changed since are rescored. Inactive requests are
+    matched without caching.
+    """
+    if not blood_request.is_active:
+        return advanced_donor_matching(blood_request, top_n)
+    
+    pool, built = get_cached_match_pool(blood_request)
+    return rank_match_pool(pool, blood_request, top_n, log=built)
+
+def get_cached_match_pool(blood_request, search_radius_km=None, variant=''):
+    """
+    (pool, built) for a request from the match cache, scored by
+    score_match_pool; built is True when the pool's rows were loaded from
+    scratch. variant names a pool cached alongside the default one (e.g.
+    loaded with a wider search_radius_km).
+    """
+    cache_key = donor_match_cache_key(blood_request.id, variant)
+    seq = current_donor_change_seq()
+    entry = cache.get(cache_key)
+    
+    if entry is not None:
+        changes = donor_changes_since(entry['seq'])
+        if changes is None:
+            entry = None
+        elif changes[1]:
+            latest, donor_ids = changes
+            rescored = build_match_pool(blood_request, donor_ids=donor_ids, search_radius_km=search_radius_km)
+            entry = {'seq': latest, 'pool': merge_match_pool(entry['pool'], rescored, donor_ids)}
+            cache.set(cache_key, entry, settings.HEMOVITAL_SETTINGS['MATCH_CACHE_TTL'])
+    
+    if entry is None:
+        entry = {'seq': seq, 'pool': build_match_pool(blood_request, search_radius_km=search_radius_km)}
+        cache.set(cache_key, entry, settings.HEMOVITAL_SETTINGS['MATCH_CACHE_TTL'])
+        return score_match_pool(entry['pool'], blood_request), True
+    
+    return score_match_pool(entry['pool'], blood_request), False
+
+# ============================================================================ #
+# 2.3 BATCH MATCHING
+# ============================================================================ #
+
+# Order in which requests pick donors in spread mode (most urgent first)
+URGENCY_PRIORITY = {'Critical': 0, 'Urgent': 1, 'Normal': 2}
+
+def match_active_requests(blood_requests=None, top_n=10, spread=False, max_matches_per_donor=1, log_predictions=True):
+    """
+    Match many requests in one pass: the donor pool is loaded once and
+    scored as a (requests x donors) matrix. Each row is restricted to the
+    donors its own search would see (compatible group, search area), so
+    per-request results equal advanced_donor_matching.
+    
+    With spread=True requests take turns picking their next best donor
+    (most urgent, then oldest first) and a donor is matched to at most
+    max_matches_per_donor requests, so the same top donors are not
+    notified for every request.
+    Returns {request_id: matches}.
+    """
+    if blood_requests is None:
+        blood_requests = BloodRequest.objects.filter(is_active=True)
+    if hasattr(blood_requests, 'select_related'):
+        blood_requests = blood_requests.select_related('hospital__hospitalprofile').order_by('id')
+    blood_requests = list(blood_requests)
+    if not blood_requests:
+        return {}
+    
+    search_radius_km = GlobalSetting.load().default_search_radius_km
+    blood_groups = sorted({
+        group for blood_request in blood_requests
+        for group in COMPATIBLE_DONOR_GROUPS.get(blood_request.blood_group, [])
+    })
+    features = load_candidate_features(blood_groups=blood_groups)
+    scores = score_candidate_matrix(features, blood_requests, search_radius_km)
+    
+    eligible = (scores['compatibility'] > 0) & get_search_area_mask(features, blood_requests, scores, search_radius_km)
+    rounded = np.round(scores['total'], 1)
+    qualified = [np.flatnonzero(row & (totals >= 40)) for row, totals in zip(eligible, scores['total'])]
+    
+    if spread:
+        selections = spread_match_selections(blood_requests, rounded, qualified, top_n, max_matches_per_donor)
+    else:
+        selections = [
+            candidates[select_top_k(rounded[row][candidates], top_n)]
+            for row, candidates in enumerate(qualified)
+        ]
+    
+    selected_ids = {int(features['ids'][index]) for indices in selections for index in indices}
+    donors = CustomUser.objects.select_related('userprofile').in_bulk(list(selected_ids))
+    
+    matches = {}
+    for row, blood_request in enumerate(blood_requests):
+        row_scores = {key: scores[key][row] for key in ('total', 'compatibility', 'distance_km')}
+        matches[blood_request.id] = build_match_results(
+            features, row_scores, selections[row], blood_request, donors=donors
+        )
+        # Sampled before the log is built, like log_ai_prediction
+        if log_predictions and should_log_prediction('DONOR_MATCH'):
+            row_rounded = rounded[row][qualified[row]]
+            write_prediction_log(**build_donor_match_log(
+                blood_request, int(eligible[row].sum()), row_rounded, select_top_k(row_rounded, 5)
+            ))
+    
+    return matches
+
+def get_search_area_mask(features, blood_requests, scores, search_radius_km):
+    """
+    (requests x donors) mask of the donors each request's own search would
+    load (see get_search_area): within the radius of a geocoded hospital, or
+    same-city donors without coordinates. Ungeocoded hospitals see everyone.
+    """
+    donor_located = ~np.isnan(features['latitude'])
+    mask = np.ones(scores['total'].shape, dtype=bool)
+    for row, blood_request in enumerate(blood_requests):
+        hospital_profile = blood_request.hospital.hospitalprofile
+        if get_search_area(hospital_profile, search_radius_km) is None:
+            continue
+        in_range = donor_located & (scores['distance_km'][row] <= search_radius_km)
+        city = (hospital_profile.city or '').lower()
+        mask[row] = in_range | (~donor_located & (features['city'] == city)) if city else in_range
+    return mask
+
+def spread_match_selections(blood_requests, rounded, qualified, top_n, max_matches_per_donor):
+    """
+    Round-robin assignment of qualified donors to requests: each round every
+    request (by urgency, then age) takes its best donor not yet used
+    max_matches_per_donor times. Returns candidate indices per request.
+    """
+    ranked = [candidates[np.argsort(-rounded[row][candidates], kind='stable')] for row, candidates in enumerate(qualified)]
+    order = sorted(
+        range(len(blood_requests)),
+        key=lambda row: (URGENCY_PRIORITY.get(blood_requests[row].urgency, 2), blood_requests[row].created_at, row)
+    )
+    positions = [0] * len(blood_requests)
+    selections = [[] for _ in blood_requests]
+    assigned = {}
+    
+    for _ in range(top_n):
+        for row in order:
+            candidates = ranked[row]
+            while positions[row] < len(candidates):
+                index = int(candidates[positions[row]])
+                positions[row] += 1
+                if assigned.get(index, 0) < max_matches_per_donor:
+                    assigned[index] = assigned.get(index, 0) + 1
+                    selections[row].append(index)
+                    break
+    
+    return [np.array(indices, dtype=np.int64) for indices in selections]
+
+def notify_donors_of_request(blood_request, donors):
+    """Bulk-create BLOOD_REQUEST notifications for donors; returns the number created"""
+    message = (
+        f"New {blood_request.urgency} request for {blood_request.blood_group} blood "
+        f"at {blood_request.hospital.hospitalprofile.hospital_name}."
+    )
+    notifications = Notification.bulk_send([
+        Notification(
+            recipient=donor,
+            message=message,
+            notification_type=Notification.NotificationType.BLOOD_REQUEST,
+            related_object_id=blood_request.id,
+            related_content_type='BloodRequest'
+        ) for donor in donors
+    ])
+    return len(notifications)
+
+# ============================================================================ #
+# 2.4 NOTIFICATION JOB QUEUE
+# ============================================================================ #
+# Matching and notifying donors runs off the request path: creating a request
+# enqueues a NotificationJob row and the run_notification_worker command
+# claims and processes jobs. The queue is a plain table, so no broker is needed.
+# Critical requests notify in waves: each wave job notifies the best donors
+# not yet notified within a wider radius, then schedules the next wave until
+# the request is fulfilled, closed or expired.
+
+def enqueue_notification_job(blood_request):
+    """Queue a match-and-notify job for a request"""
+    return NotificationJob.objects.create(blood_request=blood_request)
+
+def claim_notification_job():
+    """
+    Claim the oldest due pending job (marked RUNNING), or None when none is
+    due. The claim is a conditional UPDATE, so concurrent workers never pick
+    up the same job.
+    """
+    requeue_stale_notification_jobs()
+    pending = NotificationJob.objects.filter(
+        status=NotificationJob.Status.PENDING, run_after__lte=timezone.now()
+    ).order_by('run_after', 'id')
+    for job_id in pending.values_list('id', flat=True)[:10]:
+        claimed = NotificationJob.objects.filter(
+            id=job_id, status=NotificationJob.Status.PENDING
+        ).update(status=NotificationJob.Status.RUNNING, started_at=timezone.now(), attempts=F('attempts') + 1)
+        if claimed:
+            return NotificationJob.objects.select_related('blood_request__hospital__hospitalprofile').get(id=job_id)
+    return None
+
+def requeue_stale_notification_jobs():
+    """Put RUNNING jobs whose worker died past the timeout back in the queue (or fail them)"""
+    cutoff = timezone.now() - timedelta(seconds=settings.HEMOVITAL_SETTINGS['NOTIFICATION_JOB_TIMEOUT'])
+    stale = NotificationJob.objects.filter(status=NotificationJob.Status.RUNNING, started_at__lt=cutoff)
+    max_attempts = settings.HEMOVITAL_SETTINGS['NOTIFICATION_JOB_MAX_ATTEMPTS']
+    stale.filter(attempts__gte=max_attempts).update(
+        status=NotificationJob.Status.FAILED, error='Worker timed out', finished_at=timezone.now()
+    )
+    stale.filter(attempts__lt=max_attempts).update(status=NotificationJob.Status.PENDING)
+
+def run_notification_job(job):
+    """Match donors for a claimed job's request and notify them; failures are retried"""
+    blood_request = job.blood_request
+    critical = blood_request.urgency == BloodRequest.UrgencyLevel.CRITICAL
+    try:
+        if critical:
+            donors = select_wave_donors(blood_request, job.wave) if request_needs_donors(blood_request) else []
+        elif blood_request.is_active:
+            # A retry after the worker died mid-job must not notify the same donors twice
+            notified = set(get_notified_donor_ids(blood_request))
+            donors = [donor for donor in find_matching_donors(blood_request) if donor.id not in notified]
+        else:
+            donors = []
+        job.donors_matched = len(donors)
+        job.donors_notified = notify_donors_of_request(blood_request, donors)
+        job.status = NotificationJob.Status.DONE
+        job.error = ''
+    except Exception as e:
+        job.error = str(e)
+        if job.attempts < settings.HEMOVITAL_SETTINGS['NOTIFICATION_JOB_MAX_ATTEMPTS']:
+            job.status = NotificationJob.Status.PENDING
+            # Exponential backoff, so one bad job does not burn its attempts in one worker loop
+            delay = settings.HEMOVITAL_SETTINGS['NOTIFICATION_JOB_RETRY_DELAY'] * 2 ** (job.attempts - 1)
+            job.run_after = timezone.now() + timedelta(seconds=delay)
+        else:
+            job.status = NotificationJob.Status.FAILED
+    
+    if job.status != NotificationJob.Status.PENDING:
+        job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'run_after', 'donors_matched', 'donors_notified', 'error', 'finished_at'])
+    
+    if critical and job.status == NotificationJob.Status.DONE:
+        schedule_next_wave(job)
+    return job
+
+def request_needs_donors(blood_request):
+    """Whether a request is still open: active, not fully fulfilled and not expired"""
+    return (
+        blood_request.is_active
+        and blood_request.fulfillment_percentage < 100
+        and blood_request.expires_on > timezone.now()
+    )
+
+def get_notified_donor_ids(blood_request):
+    """Ids of donors already notified about a request"""
+    return Notification.objects.filter(
+        related_content_type='BloodRequest', related_object_id=blood_request.id
+    ).values_list('recipient_id', flat=True)
+
+def select_wave_donors(blood_request, wave):
+    """
+    Donors for one notification wave of a critical request: the best
+    qualified donors not yet notified within (wave + 1) x the default radius,
+    CRITICAL_WAVE_SIZE x 2**wave of them. Every wave ranks the same cached
+    pool, scored once out to the last wave's radius.
+    """
+    base_radius = GlobalSetting.load().default_search_radius_km
+    pool, _ = get_cached_match_pool(
+        blood_request, search_radius_km=base_radius * settings.HEMOVITAL_SETTINGS['CRITICAL_WAVES'], variant='waves'
+    )
+    radius = base_radius * (wave + 1)
+    size = settings.HEMOVITAL_SETTINGS['CRITICAL_WAVE_SIZE'] * 2 ** wave
+    
+    eligible = np.flatnonzero(
+        (pool['total'] >= 40)
+        & (np.isnan(pool['distance_km']) | (pool['distance_km'] <= radius))
+        & ~np.isin(pool['ids'], list(get_notified_donor_ids(blood_request)))
+    )
+    top = eligible[select_top_k(np.round(pool['total'][eligible], 1), size)]
+    return [match['donor'] for match in build_match_results(pool, pool, top, blood_request)]
+
+def schedule_next_wave(job):
+    """Queue the next wave of a critical request while it still needs donors"""
+    if job.wave + 1 >= settings.HEMOVITAL_SETTINGS['CRITICAL_WAVES'] or not request_needs_donors(job.blood_request):
+        return None
+    return NotificationJob.objects.create(
+        blood_request=job.blood_request,
+        wave=job.wave + 1,
+        run_after=timezone.now() + timedelta(seconds=settings.HEMOVITAL_SETTINGS['CRITICAL_WAVE_INTERVAL'])
+    )
+
+def process_notification_jobs(max_jobs=None):
+    """Process queued jobs until the queue is empty (or max_jobs ran); returns the number run"""
+    processed = 0
+    while max_jobs is None or processed < max_jobs:
+        job = claim_notification_job()
+        if job is None:
+            break
+        run_notification_job(job)
+        processed += 1
+    return processed
+
 # ============================================================================ #
 # 3. BLOOD DEMAND PREDICTION (ENHANCED)
 # ============================================================================ #
@@ -274,55 +932,45 @@ def predict_blood_demand_advanced(hospital, days=7):
     """
     predictions = {}
     
-    # Get historical data
-    historical_data = get_historical_blood_data(hospital)
+    # Get historical data (blood groups x days) and current stock per group
+    demand_matrix = get_historical_demand_matrix(hospital)
+    stock_levels = get_stock_levels([hospital.id])[0]
+    
+    # Forecast all blood groups in one kernel call
+    blood_groups = [choice[0] for choice in UserProfile.BloodGroup.choices]
+    forecasts = forecast_hospital_chunk(
+        blood_groups, demand_matrix[np.newaxis], stock_levels[np.newaxis], days
+    )[0]
     
-    for blood_group in UserProfile.BloodGroup.choices:
-        blood_data = historical_data.get(blood_group[0], [])
+    for blood_group in blood_groups:
+        prediction = forecasts.get(blood_group)
         
-        if len(blood_data) >= 7:  # Minimum data points
-            # Use multiple prediction methods
-            prediction_lr = predict_using_linear_regression(blood_data, days)
-            prediction_avg = predict_using_moving_average(blood_data, days)
-            prediction_seasonal = predict_using_seasonal_patterns(blood_data, days)
-            
-            # Combine predictions (weighted average)
-            final_prediction = (
-                prediction_lr * 0.4 + 
-                prediction_avg * 0.3 + 
-                prediction_seasonal * 0.3
-            )
-            
-            confidence = calculate_prediction_confidence(blood_data)
-            
-            predictions[blood_group[0]] = {
-                'predicted_demand': max(0, round(final_prediction)),
-                'confidence': confidence,
-                'confidence_score': confidence['score'],
-                'historical_data_points': len(blood_data),
-                'trend': get_demand_trend(blood_data),
-                'recommendation': generate_stock_recommendation(final_prediction, blood_group[0], hospital)
-            }
-        else:
+        if prediction is None:
             # Fallback to simple prediction
-            predictions[blood_group[0]] = predict_blood_demand_simple(hospital, blood_group[0], days)
+            prediction = predict_blood_demand_simple(hospital, blood_group, days)
+        
+        predictions[blood_group] = prediction
     
     # Log prediction
-    log_ai_prediction(
-        prediction_type='DEMAND_PREDICTION',
-        user=hospital,
-        input_data={
+    log_ai_prediction(**build_demand_prediction_log(hospital, days, predictions))
+    
+    return predictions
+
+def build_demand_prediction_log(hospital, days, predictions):
+    """Keyword arguments for the DEMAND_PREDICTION log of one forecast"""
+    return {
+        'prediction_type': 'DEMAND_PREDICTION',
+        'user': hospital,
+        'input_data': {
             'hospital_id': hospital.id,
             'prediction_days': days,
             'blood_groups_analyzed': len(predictions)
         },
-        output_data={
+        'output_data': {
             'predictions': {bg: data['predicted_demand'] for bg, data in predictions.items()},
             'average_confidence': np.mean([data['confidence_score'] for data in predictions.values()])
         }
-    )
-    
-    return predictions
+    }
 
 def predict_blood_demand_simple(hospital, blood_group, days=7):
     """Simple demand prediction fallback"""
@@ -345,116 +993,109 @@ def predict_blood_demand_simple(hospital, blood_group, days=7):
         'recommendation': 'Monitor closely - limited data available'
     }
 
-def get_historical_blood_data(hospital, days=90):
-    """Get historical blood request data"""
+def get_historical_demand_matrix(hospital, days=90):
+    """
+    Get daily units requested as a (blood groups x days) matrix.
+    Rows follow UserProfile.BloodGroup.choices, columns run from
+    `days` days ago to today. Read from the DailyBloodDemand rollup
+    and zero-filled in memory.
+    """
+    return get_demand_matrices([hospital.id], days)[0]
+
+def get_demand_matrices(hospital_ids, days=90):
+    """
+    Daily demand for many hospitals as a (hospitals x blood groups x days)
+    array, in the order of hospital_ids. One query over DailyBloodDemand.
+    """
     end_date = timezone.now().date()
     start_date = end_date - timedelta(days=days)
     
-    historical_requests = BloodRequest.objects.filter(
-        hospital=hospital,
-        created_at__date__range=[start_date, end_date]
-    )
+    hospital_index = {hospital_id: index for index, hospital_id in enumerate(hospital_ids)}
+    blood_group_index = {code: index for index, (code, _) in enumerate(UserProfile.BloodGroup.choices)}
+    demand_matrices = np.zeros((len(hospital_index), len(blood_group_index), days + 1), dtype=np.int64)
     
-    blood_data = {}
+    daily_totals = DailyBloodDemand.objects.filter(
+        hospital_id__in=hospital_ids,
+        date__range=[start_date, end_date]
+    ).values_list('hospital_id', 'blood_group', 'date', 'units_required')
     
-    for blood_group in UserProfile.BloodGroup.choices:
-        bg_requests = historical_requests.filter(blood_group=blood_group[0])
-        
-        # Create daily demand data
-        daily_demand = []
-        current_date = start_date
-        
-        while current_date <= end_date:
-            day_requests = bg_requests.filter(created_at__date=current_date)
-            total_units = day_requests.aggregate(total=Sum('units_required'))['total'] or 0
-            daily_demand.append(total_units)
-            current_date += timedelta(days=1)
-        
-        blood_data[blood_group[0]] = daily_demand
+    for hospital_id, blood_group, date, units in daily_totals.iterator(chunk_size=5000):
+        demand_matrices[hospital_index[hospital_id], blood_group_index[blood_group], (date - start_date).days] = units
     
-    return blood_data
+    return demand_matrices
 
-def predict_using_linear_regression(data, days_to_predict):
-    """Predict using linear regression"""
-    if len(data) < 2:
-        return np.mean(data) if data else 0
-    
-    X = np.array(range(len(data))).reshape(-1, 1)
-    y = np.array(data)
-    
-    model = LinearRegression()
-    model.fit(X, y)
-    
-    # Predict next days
-    future_days = np.array(range(len(data), len(data) + days_to_predict)).reshape(-1, 1)
-    predictions = model.predict(future_days)
-    
-    return max(0, np.mean(predictions))
-
-def predict_using_moving_average(data, days_to_predict, window=7):
-    """Predict using moving average"""
-    if len(data) < window:
-        return np.mean(data) if data else 0
+def get_stock_levels(hospital_ids):
+    """Units available as a (hospitals x blood groups) array, 0 where no stock row exists"""
+    hospital_index = {hospital_id: index for index, hospital_id in enumerate(hospital_ids)}
+    blood_group_index = {code: index for index, (code, _) in enumerate(UserProfile.BloodGroup.choices)}
+    stock_levels = np.zeros((len(hospital_index), len(blood_group_index)), dtype=np.int64)
+    
+    stock_rows = BloodStock.objects.filter(hospital_id__in=hospital_ids).values_list(
+        'hospital_id', 'blood_group', 'units_available'
+    )
+    for hospital_id, blood_group, units in stock_rows:
+        stock_levels[hospital_index[hospital_id], blood_group_index[blood_group]] = units
     
-    moving_avg = np.convolve(data, np.ones(window)/window, mode='valid')
-    return np.mean(moving_avg[-5:]) if len(moving_avg) >= 5 else np.mean(moving_avg)
+    return stock_levels
 
-def predict_using_seasonal_patterns(data, days_to_predict):
-    """Predict considering weekly patterns"""
-    if len(data) < 14:  # Need at least 2 weeks of data
-        return np.mean(data) if data else 0
-    
-    # Group by day of week
-    day_patterns = {}
-    for i, value in enumerate(data[-14:]):  # Last 2 weeks
-        day_of_week = i % 7
-        if day_of_week not in day_patterns:
-            day_patterns[day_of_week] = []
-        day_patterns[day_of_week].append(value)
-    
-    # Average by day of week
-    day_averages = {day: np.mean(values) for day, values in day_patterns.items()}
+def get_demand_summary(hospital, start_date, end_date, blood_group=None):
+    """
+    Units and request counts per blood group between two dates (inclusive),
+    read from the DailyBloodDemand rollup. Used by analytics date-range views.
+    """
+    rows = DailyBloodDemand.objects.filter(hospital=hospital, date__range=[start_date, end_date])
+    if blood_group:
+        rows = rows.filter(blood_group=blood_group)
     
-    # Predict next days based on day patterns
-    next_days = [day_averages.get((len(data) + i) % 7, 0) for i in range(days_to_predict)]
+    totals = rows.values('blood_group').annotate(
+        units=Sum('units_required'), requests=Sum('request_count')
+    ).order_by()
     
-    return np.mean(next_days)
+    return {
+        row['blood_group']: {
+            'units': row['units'],
+            'requests': row['requests'],
+            'avg_units': row['units'] / row['requests'] if row['requests'] else 0
+        }
+        for row in totals if row['requests']
+    }
 
-def calculate_prediction_confidence(data):
-    """Calculate confidence score for predictions"""
-    if len(data) < 7:
-        return {'level': 'Low', 'score': 0.3, 'reason': 'Insufficient historical data'}
-    
-    # Calculate variance (less variance = more confidence)
-    variance = np.var(data)
-    if variance == 0:
-        confidence_score = 0.9
-    else:
-        confidence_score = max(0.1, 1 - (variance / (np.mean(data) + 1)))
-    
-    if confidence_score >= 0.8:
-        level = 'High'
-    elif confidence_score >= 0.6:
-        level = 'Medium'
-    else:
-        level = 'Low'
-    
-    return {'level': level, 'score': confidence_score, 'reason': f'Based on {len(data)} data points'}
+def rebuild_daily_demand(hospital=None, batch_size=1000):
+    """Rebuild the DailyBloodDemand rollup from BloodRequest history"""
+    requests = BloodRequest.objects.all()
+    rollup = DailyBloodDemand.objects.all()
+    if hospital is not None:
+        requests = requests.filter(hospital=hospital)
+        rollup = rollup.filter(hospital=hospital)
+    
+    daily_totals = requests.annotate(
+        day=TruncDate('created_at')
+    ).values('hospital_id', 'blood_group', 'day').annotate(
+        units=Sum('units_required'), requests=Count('id')
+    ).order_by()
+    
+    with transaction.atomic():
+        rollup.delete()
+        created = DailyBloodDemand.objects.bulk_create(
+            (
+                DailyBloodDemand(
+                    hospital_id=row['hospital_id'], blood_group=row['blood_group'], date=row['day'],
+                    units_required=row['units'], request_count=row['requests']
+                )
+                for row in daily_totals.iterator(chunk_size=batch_size)
+            ),
+            batch_size=batch_size
+        )
+    
+    return len(created)
 
-def get_demand_trend(data):
-    """Get demand trend (increasing, decreasing, stable)"""
-    if len(data) < 7:
-        return 'Insufficient data'
-    
-    recent_avg = np.mean(data[-7:])
-    previous_avg = np.mean(data[-14:-7]) if len(data) >= 14 else np.mean(data[:-7])
-    
-    if recent_avg > previous_avg * 1.2:
-        return 'Increasing'
-    elif recent_avg < previous_avg * 0.8:
-        return 'Decreasing'
-    else:
-        return 'Stable'
+def get_historical_blood_data(hospital, days=90):
+    """Get historical blood request data"""
+    demand_matrix = get_historical_demand_matrix(hospital, days)
+    return {
+        code: demand_matrix[index].tolist()
+        for index, (code, _) in enumerate(UserProfile.BloodGroup.choices)
+    }
 
 def generate_stock_recommendation(predicted_demand, blood_group, hospital):
     """Generate stock management recommendations"""
@@ -466,16 +1107,83 @@ def generate_stock_recommendation(predicted_demand, blood_group, hospital):
     except BloodStock.DoesNotExist:
         current_stock = 0
     
-    stock_ratio = current_stock / (predicted_demand + 1)  # +1 to avoid division by zero
-    
-    if stock_ratio >= 2.0:
-        return "Adequate stock - maintain current levels"
-    elif stock_ratio >= 1.0:
-        return "Sufficient stock - monitor closely"
-    elif stock_ratio >= 0.5:
-        return "Low stock - consider replenishment"
+    return recommend_stock_level(current_stock, predicted_demand)
+
+# ============================================================================ #
+# 3.1 BATCH DEMAND FORECASTING
+# ============================================================================ #
+
+def forecast_all_hospitals(hospitals=None, days=7, history_days=90, workers=None, log_predictions=True):
+    """
+    Forecast demand for many hospitals in one pass.
+    Loads every hospital's demand history and stock with one query each,
+    fans the model fits out over a process pool (`workers` processes,
+    HEMOVITAL_SETTINGS['FORECAST_WORKERS'] by default; 1 runs inline) and
+    bulk-writes one DEMAND_PREDICTION log per hospital.
+    Returns {hospital_id: predictions}.
+    """
+    if hospitals is None:
+        hospitals = CustomUser.objects.filter(role=CustomUser.Role.HOSPITAL)
+    hospitals = list(hospitals.order_by('id')) if hasattr(hospitals, 'order_by') else list(hospitals)
+    if not hospitals:
+        return {}
+    
+    hospital_ids = [hospital.id for hospital in hospitals]
+    blood_groups = [code for code, _ in UserProfile.BloodGroup.choices]
+    demand_matrices = get_demand_matrices(hospital_ids, history_days)
+    stock_levels = get_stock_levels(hospital_ids)
+    
+    if workers is None:
+        workers = settings.HEMOVITAL_SETTINGS.get('FORECAST_WORKERS') or os.cpu_count() or 1
+    workers = max(1, min(workers, len(hospitals)))
+    
+    if workers == 1:
+        results = forecast_hospital_chunk(blood_groups, demand_matrices, stock_levels, days)
     else:
-        return "Critical stock - urgent replenishment needed"
+        # A few chunks per worker keeps the pool busy without per-hospital pickling overhead
+        chunk_size = max(1, -(-len(hospitals) // (workers * 4)))
+        chunks = range(0, len(hospitals), chunk_size)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunk_results = executor.map(
+                forecast_hospital_chunk,
+                [blood_groups] * len(chunks),
+                [demand_matrices[start:start + chunk_size] for start in chunks],
+                [stock_levels[start:start + chunk_size] for start in chunks],
+                [days] * len(chunks)
+            )
+            results = [predictions for chunk in chunk_results for predictions in chunk]
+    
+    forecasts = dict(zip(hospital_ids, results))
+    
+    if log_predictions:
+        for hospital, predictions in zip(hospitals, results):
+            if should_log_prediction('DEMAND_PREDICTION'):
+                write_prediction_log(**build_demand_prediction_log(hospital, days, predictions))
+    
+    return forecasts
+
+# ============================================================================ #
+# 3.2 FORECAST CACHE
+# ============================================================================ #
+
+def get_cached_demand_forecast(hospital, days=7):
+    """
+    Demand forecast for a hospital, served from cache until the TTL expires or a
+    BloodRequest/BloodStock change gives the hospital a new forecast version.
+    Returns {'predictions': ..., 'computed_at': datetime}.
+    """
+    cache_key = f'demand_forecast:{hospital.id}:{days}:{demand_forecast_version(hospital.id)}'
+    forecast = cache.get(cache_key)
+    
+    if forecast is None:
+        # Miss: fit and log once, later reloads reuse the result
+        forecast = {
+            'predictions': predict_blood_demand_advanced(hospital, days),
+            'computed_at': timezone.now()
+        }
+        cache.set(cache_key, forecast, settings.HEMOVITAL_SETTINGS['FORECAST_CACHE_TTL'])
+    
+    return forecast
 
 # ============================================================================ #
 # 4. DONOR ELIGIBILITY & NEXT DONATION PREDICTION
@@ -491,8 +1199,8 @@ def predict_next_eligible_date(user):
     if not profile.last_donation_date:
         return timezone.now().date()
     
-    # Basic eligibility: 90 days gap
-    next_date = profile.last_donation_date + timedelta(days=90)
+    # Basic eligibility: configured donation gap (90 days by default)
+    next_date = profile.last_donation_date + timedelta(days=GlobalSetting.load().donation_gap_days)
     
     # Adjust based on user health profile
     if profile.weight and profile.weight < 50:
@@ -524,11 +1232,12 @@ def check_donation_eligibility(user):
     
     # Donation gap check
     if profile.last_donation_date:
+        gap_days = GlobalSetting.load().donation_gap_days
         days_since_last = (timezone.now().date() - profile.last_donation_date).days
-        if days_since_last < 90:
+        if days_since_last < gap_days:
             eligibility['eligible'] = False
-            eligibility['reasons'].append(f"Last donation was {days_since_last} days ago (90 days required)")
-            eligibility['next_eligible_date'] = profile.last_donation_date + timedelta(days=90)
+            eligibility['reasons'].append(f"Last donation was {days_since_last} days ago ({gap_days} days required)")
+            eligibility['next_eligible_date'] = profile.last_donation_date + timedelta(days=gap_days)
     
     # Availability check
     if not profile.is_available:
@@ -545,12 +1254,10 @@ def analyze_donor_retention_risk(hospital=None):
     """
     Comprehensive donor retention risk analysis
     """
-    if hospital:
-        # Analyze donors for specific hospital
-        donors = CustomUser.objects.filter(role=CustomUser.Role.DONOR)
-    else:
-        # System-wide analysis
-        donors = CustomUser.objects.filter(role=CustomUser.Role.DONOR)
+    # Same donors either way: hospital-specific and system-wide analysis match
+    donors = list(retention_donor_queryset())
+    features = load_retention_features(donors, get_group_request_counts(days=90))
+    scores = score_retention_risk(features)
     
     retention_analysis = {
         'high_risk': [],
@@ -559,8 +1266,8 @@ def analyze_donor_retention_risk(hospital=None):
         'summary_stats': {}
     }
     
-    for donor in donors:
-        risk_analysis = predict_donor_retention_risk(donor)
+    for index, donor in enumerate(donors):
+        risk_analysis = build_retention_analysis(donor, features, scores, index)
         
         if risk_analysis['risk_level'] == 'High':
             retention_analysis['high_risk'].append({
@@ -582,11 +1289,12 @@ def analyze_donor_retention_risk(hospital=None):
     total_donors = len(donors)
     retention_analysis['summary_stats'] = {
         'total_donors': total_donors,
+        'unscored_donors': 0,
         'high_risk_count': len(retention_analysis['high_risk']),
         'medium_risk_count': len(retention_analysis['medium_risk']),
         'low_risk_count': len(retention_analysis['low_risk']),
-        'retention_rate': calculate_overall_retention_rate(),
-        'avg_engagement_score': calculate_average_engagement_score()
+        'retention_rate': summarize_retention_rate(features),
+        'avg_engagement_score': summarize_engagement_score(features)
     }
     
     return retention_analysis
@@ -646,13 +1354,11 @@ def analyze_donation_activity(donor):
     risk_points = 0
     factors = []
     
-    donations = Donation.objects.filter(donor=donor)
-    completed_donations = donations.filter(status=Donation.DonationStatus.COMPLETED)
+    features = get_donor_features(donor)
     
     # Last donation recency
-    last_donation = completed_donations.order_by('-donation_date').first()
-    if last_donation:
-        days_since_donation = (timezone.now().date() - last_donation.donation_date).days
+    if features.last_donation_date:
+        days_since_donation = (timezone.now().date() - features.last_donation_date).days
         
         if days_since_donation > 365:  # 1 year
             risk_points += 25
@@ -665,7 +1371,7 @@ def analyze_donation_activity(donor):
         factors.append("Never donated")
     
     # Donation frequency
-    donation_count = completed_donations.count()
+    donation_count = features.completed_donations
     if donation_count == 0:
         risk_points += 10
         factors.append("No donation history")
@@ -717,10 +1423,7 @@ def analyze_response_behavior(donor):
         created_at__gte=timezone.now() - timedelta(days=90)
     ).count()
     
-    recent_responses = Donation.objects.filter(
-        donor=donor,
-        created_at__gte=timezone.now() - timedelta(days=90)
-    ).count()
+    recent_responses = get_donor_features(donor).responses_90d
     
     if recent_requests > 0:
         response_rate = recent_responses / recent_requests
@@ -789,20 +1492,364 @@ def calculate_average_engagement_score():
     
     return 0
 
+# ============================================================================ #
+# 5.1 BATCH RETENTION SCORING
+# ============================================================================ #
+
+def retention_donor_queryset():
+    """Donors with the profile and analytics rows the retention scorer reads"""
+    return CustomUser.objects.filter(
+        role=CustomUser.Role.DONOR
+    ).select_related('userprofile', 'analytics').order_by('id')
+
+def load_retention_features(donors, group_requests):
+    """
+    Retention inputs for a list of donors as NumPy arrays.
+    Donors must come from retention_donor_queryset so no per-donor queries run;
+    group_requests is get_group_request_counts(days=90).
+    """
+    profiles = [donor.userprofile for donor in donors]
+    analytics = [getattr(donor, 'analytics', None) for donor in donors]
+    
+    return {
+        'blood_group': np.array([profile.blood_group or '' for profile in profiles], dtype=object),
+        'profile_completion': np.array([profile.profile_completion_score for profile in profiles], dtype=np.int64),
+        'has_analytics': np.array([row is not None for row in analytics], dtype=bool),
+        'engagement_score': np.array([row.engagement_score if row else 0 for row in analytics], dtype=float),
+        'response_rate': np.array([row.response_rate if row else 0 for row in analytics], dtype=float),
+        'completed_donations': np.array([row.completed_donations if row else 0 for row in analytics], dtype=np.int64),
+        'last_donation': np.array(
+            [row.last_donation_date.toordinal() if row and row.last_donation_date else -1 for row in analytics],
+            dtype=np.int64
+        ),
+        'responses_90d': np.array([row.responses_90d if row else 0 for row in analytics], dtype=np.int64),
+        'group_requests_90d': np.array(
+            [group_requests.get(profile.blood_group, 0) for profile in profiles], dtype=np.int64
+        ),
+    }
+
+def score_retention_risk(features):
+    """
+    Risk points for every donor as array operations.
+    Mirrors predict_donor_retention_risk, one array element per donor.
+    """
+    today = timezone.now().date().toordinal()
+    
+    # 1. Donation Activity (35 points max)
+    has_donated = features['last_donation'] >= 0
+    days_since_donation = np.where(has_donated, today - features['last_donation'], 0)
+    inactive_year = has_donated & (days_since_donation > 365)
+    inactive_half_year = has_donated & ~inactive_year & (days_since_donation > 180)
+    no_history = features['completed_donations'] == 0
+    activity = 25 * inactive_year + 15 * inactive_half_year + 20 * ~has_donated + 10 * no_history
+    
+    # 2. Engagement Metrics (30 points max)
+    has_analytics = features['has_analytics']
+    low_engagement = has_analytics & (features['engagement_score'] < 30)
+    moderate_engagement = has_analytics & ~low_engagement & (features['engagement_score'] < 50)
+    low_response_rate = has_analytics & (features['response_rate'] < 0.2)
+    engagement = 20 * low_engagement + 10 * moderate_engagement + 10 * low_response_rate
+    
+    # 3. Profile Completeness (20 points max)
+    incomplete_profile = features['profile_completion'] < 70
+    missing_blood_group = features['blood_group'] == ''
+    profile = 15 * incomplete_profile + 5 * missing_blood_group
+    
+    # 4. Response Behavior (15 points max)
+    group_requests = features['group_requests_90d']
+    recent_response_rate = np.divide(
+        features['responses_90d'], group_requests,
+        out=np.zeros(len(group_requests)), where=group_requests > 0
+    )
+    low_recent_response = (group_requests > 0) & (recent_response_rate < 0.1)
+    response = 10 * low_recent_response
+    
+    total = activity + engagement + profile + response
+    
+    return {
+        'days_since_donation': days_since_donation,
+        'inactive_year': inactive_year,
+        'inactive_half_year': inactive_half_year,
+        'never_donated': ~has_donated,
+        'no_history': no_history,
+        'low_engagement': low_engagement,
+        'moderate_engagement': moderate_engagement,
+        'low_response_rate': low_response_rate,
+        'incomplete_profile': incomplete_profile,
+        'missing_blood_group': missing_blood_group,
+        'recent_response_rate': recent_response_rate,
+        'low_recent_response': low_recent_response,
+        'total': total,
+        'risk_level': np.select([total >= 60, total >= 35], ['High', 'Medium'], default='Low'),
+    }
+
+def build_retention_analysis(donor, features, scores, index):
+    """Analysis dict for one scored donor, same shape as predict_donor_retention_risk"""
+    risk_factors = get_retention_risk_factors(features, scores, index)
+    analytics = getattr(donor, 'analytics', None)
+    
+    return {
+        'risk_level': str(scores['risk_level'][index]),
+        'risk_score': int(scores['total'][index]),
+        'risk_factors': risk_factors[:5],  # Top 5 factors
+        'recommendations': generate_retention_recommendations(risk_factors, donor),
+        'engagement_score': analytics.engagement_score if analytics else 0,
+        'last_activity': analytics.last_activity if analytics else None
+    }
+
+def get_retention_risk_factors(features, scores, index):
+    """Human-readable reasons behind one scored donor's retention risk"""
+    risk_factors = []
+    days_since_donation = int(scores['days_since_donation'][index])
+    engagement_score = features['engagement_score'][index]
+    
+    if scores['inactive_year'][index]:
+        risk_factors.append(f"Inactive for {days_since_donation} days")
+    elif scores['inactive_half_year'][index]:
+        risk_factors.append(f"No donation in {days_since_donation} days")
+    elif scores['never_donated'][index]:
+        risk_factors.append("Never donated")
+    if scores['no_history'][index]:
+        risk_factors.append("No donation history")
+    
+    if scores['low_engagement'][index]:
+        risk_factors.append(f"Low engagement score ({engagement_score:.1f})")
+    elif scores['moderate_engagement'][index]:
+        risk_factors.append(f"Moderate engagement score ({engagement_score:.1f})")
+    if scores['low_response_rate'][index]:
+        risk_factors.append(f"Low response rate ({features['response_rate'][index]:.1%})")
+    
+    if scores['incomplete_profile'][index]:
+        risk_factors.append(f"Incomplete profile ({features['profile_completion'][index]}%)")
+    if scores['missing_blood_group'][index]:
+        risk_factors.append("Blood group not specified")
+    
+    if scores['low_recent_response'][index]:
+        risk_factors.append(f"Low recent response rate ({scores['recent_response_rate'][index]:.1%})")
+    
+    return risk_factors
+
+def summarize_retention_rate(features):
+    """Share of donors with a completed donation in the last 180 days (calculate_overall_retention_rate)"""
+    total_donors = len(features['last_donation'])
+    if total_donors == 0:
+        return 0
+    
+    cutoff = timezone.localdate(timezone.now() - timedelta(days=180)).toordinal()
+    active_donors = int(np.count_nonzero(features['last_donation'] >= cutoff))
+    return (active_donors / total_donors) * 100
+
+def summarize_engagement_score(features):
+    """Average engagement score of donors with analytics (calculate_average_engagement_score)"""
+    scores = features['engagement_score'][features['has_analytics']]
+    if len(scores):
+        return round(float(scores.mean()), 1)
+    return 0
+
+def score_all_donor_retention(batch_size=1000):
+    """
+    Score every donor's retention risk and store it on DonorAnalytics.
+    Donors are streamed in chunks of batch_size so memory stays bounded;
+    meant to run nightly (manage.py score_donor_retention).
+    """
+    now = timezone.now()
+    group_requests = get_group_request_counts(days=90)
+    
+    scored = 0
+    batch = []
+    for donor in retention_donor_queryset().iterator(chunk_size=batch_size):
+        batch.append(donor)
+        if len(batch) >= batch_size:
+            scored += save_retention_score_batch(batch, group_requests, now)
+            batch = []
+    if batch:
+        scored += save_retention_score_batch(batch, group_requests, now)
+    
+    return scored
+
+def save_retention_score_batch(donors, group_requests, now):
+    """Score one chunk of donors and write the results with bulk_update"""
+    features = load_retention_features(donors, group_requests)
+    scores = score_retention_risk(features)
+    
+    new_rows = []
+    existing_rows = []
+    for index, (donor, risk_score) in enumerate(zip(donors, scores['total'].tolist())):
+        analytics = getattr(donor, 'analytics', None)
+        if analytics is None:
+            analytics = DonorAnalytics(donor=donor)
+            new_rows.append(analytics)
+        else:
+            existing_rows.append(analytics)
+        
+        analytics.retention_risk_score = risk_score
+        analytics.churn_probability = risk_score / 100  # Risk points max out at 100
+        analytics.retention_risk_factors = get_retention_risk_factors(features, scores, index)
+        analytics.retention_scored_at = now
+    
+    DonorAnalytics.objects.bulk_create(new_rows)
+    DonorAnalytics.objects.bulk_update(
+        existing_rows, ['retention_risk_score', 'churn_probability', 'retention_risk_factors', 'retention_scored_at']
+    )
+    return len(donors)
+
+# Stored retention_risk_score ranges of the High/Medium/Low buckets
+RETENTION_RISK_BUCKETS = {
+    'High': Q(retention_risk_score__gte=60),
+    'Medium': Q(retention_risk_score__gte=35, retention_risk_score__lt=60),
+    'Low': Q(retention_risk_score__lt=35),
+}
+
+def retention_risk_level(risk_score):
+    """Bucket (High/Medium/Low) of a stored retention_risk_score"""
+    return 'High' if risk_score >= 60 else 'Medium' if risk_score >= 35 else 'Low'
+
+def build_stored_retention_analysis(donor, analytics):
+    """
+    Analysis dict rendered from the scores stored by score_all_donor_retention,
+    so the level shown always matches the bucket the donor was listed under
+    """
+    risk_factors = analytics.retention_risk_factors
+    return {
+        'risk_level': retention_risk_level(analytics.retention_risk_score),
+        'risk_score': int(analytics.retention_risk_score),
+        'risk_factors': risk_factors[:5],
+        'recommendations': generate_retention_recommendations(risk_factors, donor),
+        'engagement_score': analytics.engagement_score,
+        'last_activity': analytics.last_activity
+    }
+
+def get_materialized_retention_risk(limit=10):
+    """
+    Retention analysis read from the stored DonorAnalytics scores: bucket counts
+    plus the `limit` highest-risk donors of each bucket. Falls back to the live
+    analyze_donor_retention_risk until score_all_donor_retention has run.
+    """
+    scored = DonorAnalytics.objects.filter(
+        donor__role=CustomUser.Role.DONOR, retention_scored_at__isnull=False
+    )
+    buckets = {
+        'high_risk': RETENTION_RISK_BUCKETS['High'],
+        'medium_risk': RETENTION_RISK_BUCKETS['Medium'],
+        'low_risk': RETENTION_RISK_BUCKETS['Low'],
+    }
+    
+    totals = scored.aggregate(
+        scored_donors=Count('id'),
+        high_risk_count=Count('id', filter=buckets['high_risk']),
+        medium_risk_count=Count('id', filter=buckets['medium_risk']),
+        low_risk_count=Count('id', filter=buckets['low_risk']),
+        avg_engagement_score=Avg('engagement_score')
+    )
+    if not totals['scored_donors']:
+        return analyze_donor_retention_risk()
+    
+    # Totals cover every donor, scored or not (new donors wait for the next scoring run)
+    active_cutoff = timezone.now() - timedelta(days=180)
+    totals.update(UserProfile.objects.filter(user__role=CustomUser.Role.DONOR).aggregate(
+        total_donors=Count('pk'),
+        active_donors=Count('pk', filter=Q(user__analytics__last_donation_date__gte=active_cutoff)),
+    ))
+    
+    # ORDER BY retention_risk_score DESC LIMIT n per bucket
+    top_ids = {
+        bucket: list(
+            scored.filter(condition).order_by('-retention_risk_score', 'donor_id')
+            .values_list('donor_id', flat=True)[:limit]
+        )
+        for bucket, condition in buckets.items()
+    }
+    
+    donors_by_id = retention_donor_queryset().in_bulk([donor_id for ids in top_ids.values() for donor_id in ids])
+    retention_analysis = {
+        bucket: [
+            {'donor': donors_by_id[donor_id], 'analysis': build_stored_retention_analysis(
+                donors_by_id[donor_id], donors_by_id[donor_id].analytics
+            )}
+            for donor_id in ids
+        ]
+        for bucket, ids in top_ids.items()
+    }
+    retention_analysis['summary_stats'] = {
+        'total_donors': totals['total_donors'],
+        'unscored_donors': max(totals['total_donors'] - totals['scored_donors'], 0),
+        'high_risk_count': totals['high_risk_count'],
+        'medium_risk_count': totals['medium_risk_count'],
+        'low_risk_count': totals['low_risk_count'],
+        'retention_rate': (totals['active_donors'] / totals['total_donors']) * 100 if totals['total_donors'] else 0,
+        'avg_engagement_score': round(totals['avg_engagement_score'] or 0, 1)
+    }
+    
+    return retention_analysis
+
+def get_retention_risk_page(cursor=None, page_size=50, risk_level=None, blood_group=None, city=None):
+    """
+    One page of stored retention scores, highest risk first, with keyset
+    pagination: cursor is the (retention_risk_score, donor_id) of the last row
+    of the previous page, so every page is an index range scan of page_size
+    rows no matter how deep. Returns (entries, next_cursor) where entries is a
+    generator of {'donor', 'analysis'} dicts rendered from the stored scores
+    and next_cursor is None on the last page.
+    """
+    rows = DonorAnalytics.objects.filter(
+        donor__role=CustomUser.Role.DONOR, retention_scored_at__isnull=False
+    )
+    if risk_level:
+        rows = rows.filter(RETENTION_RISK_BUCKETS[risk_level])
+    if blood_group:
+        rows = rows.filter(donor__userprofile__blood_group=blood_group)
+    if city:
+        rows = rows.filter(donor__userprofile__city__iexact=city)
+    if cursor:
+        last_score, last_donor_id = cursor
+        rows = rows.filter(
+            Q(retention_risk_score__lt=last_score) |
+            Q(retention_risk_score=last_score, donor_id__gt=last_donor_id)
+        )
+    
+    page = list(
+        rows.select_related('donor__userprofile')
+        .order_by('-retention_risk_score', 'donor_id')[:page_size + 1]
+    )
+    next_cursor = None
+    if len(page) > page_size:
+        page = page[:page_size]
+        next_cursor = (page[-1].retention_risk_score, page[-1].donor_id)
+    
+    entries = (
+        {'donor': row.donor, 'analysis': build_stored_retention_analysis(row.donor, row)}
+        for row in page
+    )
+    return entries, next_cursor
+
 # ============================================================================ #
 # 6. AI PREDICTION LOGGING UTILITY
 # ============================================================================ #
 
 def log_ai_prediction(prediction_type, user, input_data, output_data, confidence=0.8):
-    """Log AI predictions for monitoring and improvement"""
-    AIPredictionLog.objects.create(
+    """
+    Log AI predictions for monitoring and improvement.
+    Rows are sampled per PREDICTION_LOG_SAMPLE_RATES and written in bulk by
+    the buffered log writer, off the caller's request path.
+    """
+    if should_log_prediction(prediction_type):
+        write_prediction_log(prediction_type, user, input_data, output_data, confidence)
+
+def should_log_prediction(prediction_type):
+    """Sampling decision for one prediction log row (PREDICTION_LOG_SAMPLE_RATES, default 1)"""
+    sample_rate = settings.HEMOVITAL_SETTINGS['PREDICTION_LOG_SAMPLE_RATES'].get(prediction_type, 1.0)
+    return sample_rate >= 1 or random.random() < sample_rate
+
+def write_prediction_log(prediction_type, user, input_data, output_data, confidence=0.8):
+    """Queue an already-sampled prediction log row on the buffered log writer"""
+    log_writer.add(AIPredictionLog(
         prediction_type=prediction_type,
         target_user=user,
         input_data=input_data,
         output_data=output_data,
         confidence_score=confidence,
         timestamp=timezone.now()
-    )
+    ))
 
 # ============================================================================ #
 # 7. ANALYTICS DATA UPDATERS
@@ -817,28 +1864,390 @@ def update_donor_analytics(donor):
     profile_completion = donor.userprofile.profile_completion_score
     
     # Simple engagement calculation
-    analytics.engagement_score = min(100, (donations_count * 10) + (profile_completion * 0.5))
+    analytics.engagement_score = calculate_engagement_score(donations_count, profile_completion)
     analytics.last_activity = timezone.now()
+    analytics.computed_at = analytics.last_activity
     analytics.save()
     
     return analytics
 
+def calculate_engagement_score(completed_donations, profile_completion):
+    """Engagement score (0-100) from completed donations and profile completion"""
+    return min(100, (completed_donations * 10) + (profile_completion * 0.5))
+
+def refresh_all_donor_features(batch_size=1000):
+    """
+    Rebuild the donation feature columns of DonorAnalytics for every donor.
+    The rolling 90/180-day response windows only move when a donation is
+    saved, so this is meant to run nightly to let old responses age out.
+    """
+    now = timezone.now()
+    donor_stats = CustomUser.objects.filter(role=CustomUser.Role.DONOR).annotate(
+        **DonorAnalytics.donation_feature_aggregates(now)
+    ).values('id', 'completed_count', 'first_date', 'last_date', 'recent_90d', 'recent_180d')
+    
+    refreshed = 0
+    batch = []
+    for stats in donor_stats.iterator(chunk_size=batch_size):
+        batch.append(stats)
+        if len(batch) >= batch_size:
+            refreshed += save_donor_feature_batch(batch, now)
+            batch = []
+    if batch:
+        refreshed += save_donor_feature_batch(batch, now)
+    
+    return refreshed
+
+def geocode_profiles(batch_size=1000):
+    """
+    Re-resolve the cached coordinates (and donor grid cells) of every donor
+    and hospital profile from PincodeLocation. Run after loading pincodes.
+    Returns the number of profiles that now have coordinates.
+    """
+    located = 0
+    for model in (UserProfile, HospitalProfile):
+        rows = model.objects.exclude(pincode__isnull=True).exclude(pincode='').values_list('pk', 'pincode')
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                located += save_geocoded_batch(model, batch)
+                batch = []
+        if batch:
+            located += save_geocoded_batch(model, batch)
+    return located
+
+def save_geocoded_batch(model, batch):
+    """Look up one batch of (pk, pincode) rows and bulk_update their coordinates"""
+    coordinates = {
+        pincode: (latitude, longitude)
+        for pincode, latitude, longitude in PincodeLocation.objects.filter(
+            pincode__in={pincode for _, pincode in batch}
+        ).values_list('pincode', 'latitude', 'longitude')
+    }
+    
+    fields = ['latitude', 'longitude']
+    if model is UserProfile:
+        fields += ['grid_row', 'grid_column']
+    
+    profiles = []
+    for pk, pincode in batch:
+        latitude, longitude = coordinates.get(pincode, (None, None))
+        profile = model(pk=pk, latitude=latitude, longitude=longitude)
+        if model is UserProfile:
+            profile.grid_row, profile.grid_column = grid_cell(latitude, longitude)
+        profiles.append(profile)
+    
+    model.objects.bulk_update(profiles, fields)
+    return sum(1 for _, pincode in batch if pincode in coordinates)
+
+def save_donor_feature_batch(batch, now):
+    """Write one batch of donor feature aggregates with bulk_update"""
+    stats_by_donor = {stats['id']: stats for stats in batch}
+    existing = set(
+        DonorAnalytics.objects.filter(donor_id__in=stats_by_donor).values_list('donor_id', flat=True)
+    )
+    DonorAnalytics.objects.bulk_create([
+        DonorAnalytics(donor_id=donor_id) for donor_id in stats_by_donor if donor_id not in existing
+    ])
+    
+    analytics_rows = list(DonorAnalytics.objects.filter(donor_id__in=stats_by_donor))
+    for analytics in analytics_rows:
+        analytics.apply_donation_features(stats_by_donor[analytics.donor_id], now)
+    
+    DonorAnalytics.objects.bulk_update(analytics_rows, [
+        'completed_donations', 'first_donation_date', 'last_donation_date',
+        'responses_90d', 'responses_180d', 'features_updated_at'
+    ])
+    return len(analytics_rows)
+
 def update_hospital_analytics(hospital):
     """Update analytics for a specific hospital"""
-    analytics, created = HospitalAnalytics.objects.get_or_create(hospital=hospital)
+    analytics, created = HospitalAnalytics.get_or_create_counted(hospital.id)
     
-    # Calculate fulfillment rate
-    total_requests = hospital.blood_requests.count()
-    fulfilled_requests = hospital.blood_requests.filter(status='Fulfilled').count()
+    # Calculate fulfillment rate from the counter cache (the counters themselves
+    # are only moved by F() updates, so they are never saved from here)
+    analytics.fulfillment_rate = calculate_fulfillment_rate(analytics.total_requests, analytics.fulfilled_requests)
+    analytics.last_updated = timezone.now()
+    analytics.computed_at = analytics.last_updated
+    analytics.save(update_fields=['fulfillment_rate', 'last_updated', 'computed_at'])
     
-    if total_requests > 0:
-        analytics.fulfillment_rate = (fulfilled_requests / total_requests) * 100
-    else:
-        analytics.fulfillment_rate = 0
+    return analytics
+
+def calculate_fulfillment_rate(total_requests, fulfilled_requests):
+    """Percentage of a hospital's requests that were fulfilled"""
+    return (fulfilled_requests / total_requests) * 100 if total_requests > 0 else 0
+
+# ============================================================================ #
+# 7.1 WRITE-BEHIND ANALYTICS REFRESH
+# ============================================================================ #
+
+def refresh_dirty_analytics(interval=None, batch_size=500):
+    """
+    Recompute donor and hospital analytics rows flagged by mark_analytics_dirty,
+    skipping rows computed less than `interval` seconds ago
+    (ANALYTICS_REFRESH_INTERVAL by default) so each user is recomputed at most
+    once per interval. Works in batches of one aggregate query and one
+    bulk_update each. Returns (donors refreshed, hospitals refreshed).
+    """
+    if interval is None:
+        interval = settings.HEMOVITAL_SETTINGS['ANALYTICS_REFRESH_INTERVAL']
+    cutoff = timezone.now() - timedelta(seconds=interval)
+    
+    donors = hospitals = 0
+    while True:
+        refreshed = refresh_donor_analytics_batch(claim_dirty_analytics(DonorAnalytics, cutoff, batch_size))
+        donors += refreshed
+        if refreshed < batch_size:
+            break
+    while True:
+        refreshed = refresh_hospital_analytics_batch(claim_dirty_analytics(HospitalAnalytics, cutoff, batch_size))
+        hospitals += refreshed
+        if refreshed < batch_size:
+            break
+    return donors, hospitals
+
+def claim_dirty_analytics(model, cutoff, batch_size):
+    """
+    Take up to batch_size flagged rows due for recomputation and clear their
+    flags first, so events arriving during the recompute flag them again.
+    """
+    rows = list(
+        model.objects.filter(dirty_since__isnull=False)
+        .filter(Q(computed_at__isnull=True) | Q(computed_at__lte=cutoff))
+        .order_by('dirty_since')[:batch_size]
+    )
+    if rows:
+        model.objects.filter(pk__in=[row.pk for row in rows]).update(dirty_since=None)
+    return rows
+
+def refresh_donor_analytics_batch(rows):
+    """Recompute engagement for a batch of DonorAnalytics rows"""
+    if not rows:
+        return 0
     
-    analytics.total_requests = total_requests
-    analytics.fulfilled_requests = fulfilled_requests
-    analytics.last_updated = timezone.now()
-    analytics.save()
+    stats = {
+        donor_id: (completed, profile_completion or 0)
+        for donor_id, completed, profile_completion in CustomUser.objects.filter(
+            id__in=[row.donor_id for row in rows]
+        ).annotate(
+            completed=Count('donations', filter=Q(donations__status=Donation.DonationStatus.COMPLETED))
+        ).values_list('id', 'completed', 'userprofile__profile_completion_score')
+    }
+    
+    now = timezone.now()
+    for row in rows:
+        completed, profile_completion = stats.get(row.donor_id, (0, 0))
+        row.engagement_score = calculate_engagement_score(completed, profile_completion)
+        # The flag time is when the donor last did something that counts
+        row.last_activity = row.dirty_since
+        row.computed_at = now
+        row.last_updated = now
+    DonorAnalytics.objects.bulk_update(rows, ['engagement_score', 'last_activity', 'computed_at', 'last_updated'])
+    return len(rows)
+
+def refresh_hospital_analytics_batch(rows):
+    """Recompute the fulfillment rate of a batch of HospitalAnalytics rows from their counters"""
+    if not rows:
+        return 0
     
-    return analytics
\ No newline at end of file
+    # Rows never computed may have been created with zeroed counters (mark_analytics_dirty)
+    for row in rows:
+        if row.computed_at is None:
+            HospitalAnalytics.recount(row.hospital_id)
+    
+    # Re-read the counters: they move with F() updates, not through these instances
+    counters = {
+        hospital_id: (total, fulfilled)
+        for hospital_id, total, fulfilled in HospitalAnalytics.objects.filter(
+            pk__in=[row.pk for row in rows]
+        ).values_list('hospital_id', 'total_requests', 'fulfilled_requests')
+    }
+    
+    now = timezone.now()
+    for row in rows:
+        total, fulfilled = counters.get(row.hospital_id, (0, 0))
+        row.fulfillment_rate = calculate_fulfillment_rate(total, fulfilled)
+        row.computed_at = now
+        row.last_updated = now
+    HospitalAnalytics.objects.bulk_update(rows, ['fulfillment_rate', 'computed_at', 'last_updated'])
+    return len(rows)
+
+# ============================================================================ #
+# 8. NOTIFICATION INBOX
+# ============================================================================ #
+
+def get_notification_page(user, cursor=None, page_size=20, unread_only=False):
+    """
+    One page of a user's notifications, newest first, with keyset pagination
+    on (created_at, id) so deep pages stay an index range scan of the
+    (recipient, -created_at, -id) index, or (recipient, is_read, -created_at)
+    for unread_only. Returns (notifications, next_cursor);
+    next_cursor is None on the last page.
+    """
+    rows = Notification.objects.filter(recipient=user)
+    if unread_only:
+        rows = rows.filter(is_read=False)
+    if cursor:
+        last_created_at, last_id = cursor
+        rows = rows.filter(
+            Q(created_at__lt=last_created_at) |
+            Q(created_at=last_created_at, id__lt=last_id)
+        )
+    
+    page = list(rows.order_by('-created_at', '-id')[:page_size + 1])
+    next_cursor = None
+    if len(page) > page_size:
+        page = page[:page_size]
+        next_cursor = (page[-1].created_at, page[-1].id)
+    
+    return page, next_cursor
+
+def mark_notifications_read(user, ids=None):
+    """Mark the user's notifications (all, or only ids) read; returns (marked, unread count)"""
+    marked = Notification.mark_read(user.id, ids)
+    unread = CustomUser.objects.filter(id=user.id).values_list('unread_notification_count', flat=True).first() or 0
+    user.unread_notification_count = unread
+    return marked, unread
+
+# ============================================================================ #
+# 9. DATA RETENTION & ARCHIVAL
+# ============================================================================ #
+# Append-only tables are pruned by age: rows older than their TTL are copied
+# to gzip-compressed JSONL files, one per chunk and month
+# (ARCHIVE_DIR/<table>/<YYYY-MM>/<chunk's first row id>.jsonl.gz), then
+# deleted. Each chunk is an index range scan on the timestamp column, oldest
+# first. A run that crashes between writing and deleting a chunk selects the
+# same oldest rows next time and overwrites the same files, so rows are never
+# archived twice.
+
+# table name: (model, timestamp field, HEMOVITAL_SETTINGS key of the TTL in days)
+RETENTION_POLICIES = {
+    'notifications': (Notification, 'created_at', 'NOTIFICATION_RETENTION_DAYS'),
+    'prediction_logs': (AIPredictionLog, 'timestamp', 'PREDICTION_LOG_RETENTION_DAYS'),
+    'chatbot_conversations': (ChatbotConversation, 'created_at', 'CHATBOT_RETENTION_DAYS'),
+}
+
+def archive_expired_rows(table, days=None, batch_size=1000, archive=True, dry_run=False):
+    """
+    Archive and delete one table's rows older than its TTL (or `days`).
+    Returns the number of rows archived (or that would be, with dry_run).
+    """
+    model, time_field, ttl_setting = RETENTION_POLICIES[table]
+    if days is None:
+        days = settings.HEMOVITAL_SETTINGS[ttl_setting]
+    cutoff = timezone.now() - timedelta(days=days)
+    expired = model.objects.filter(**{f'{time_field}__lt': cutoff})
+    if dry_run:
+        return expired.count()
+    
+    fields = [field.attname for field in model._meta.concrete_fields]
+    total = 0
+    while True:
+        rows = list(expired.order_by(time_field, 'pk').values(*fields)[:batch_size])
+        if not rows:
+            break
+        if archive:
+            write_archive_rows(table, rows, time_field)
+        ids = [row['id'] for row in rows]
+        if model is Notification:
+            Notification.delete_expired(ids)
+        else:
+            model.objects.filter(id__in=ids).delete()
+        total += len(rows)
+    return total
+
+def write_archive_rows(table, rows, time_field):
+    """Write one chunk to its month-bucketed gzip JSONL files (replacing any earlier copy)"""
+    by_month = {}
+    for row in rows:
+        by_month.setdefault(row[time_field].strftime('%Y-%m'), []).append(row)
+    
+    for month, month_rows in by_month.items():
+        directory = os.path.join(settings.HEMOVITAL_SETTINGS['ARCHIVE_DIR'], table, month)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{rows[0]['id']:012d}.jsonl.gz")
+        # Written under a temporary name and renamed, so a file is either complete or absent
+        with gzip.open(path + '.tmp', 'wt', encoding='utf-8') as archive_file:
+            for row in month_rows:
+                archive_file.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+        os.replace(path + '.tmp', path)
+
+def archive_all_expired_rows(batch_size=1000, archive=True, dry_run=False):
+    """Apply every retention policy; returns {table: rows archived}"""
+    return {
+        table: archive_expired_rows(table, batch_size=batch_size, archive=archive, dry_run=dry_run)
+        for table in RETENTION_POLICIES
+    }
+
+# ============================================================================ #
+# 10. HOT QUERY PLANS
+# ============================================================================ #
+# The request lists donors and hospitals hit on every page view must stay
+# index scans as BloodRequest grows. Each entry builds the same query the
+# views run (with sample parameters); check_query_plans EXPLAINs them all and
+# fails on a sequential scan of any large table.
+
+def get_open_requests_for_group(blood_group):
+    """Active, unexpired requests for one blood group, most urgent and newest first"""
+    return BloodRequest.objects.filter(
+        is_active=True,
+        blood_group=blood_group,
+        expires_on__gt=timezone.now()
+    ).order_by('urgency', '-created_at')
+
+def get_hospital_open_requests(hospital):
+    """A hospital's active requests, newest first"""
+    return BloodRequest.objects.filter(hospital=hospital, is_active=True).order_by('-created_at')
+
+# query name: callable returning the queryset as the views evaluate it
+HOT_QUERIES = {
+    'donor_open_requests': lambda: get_open_requests_for_group('O+')[:5],
+    'hospital_open_requests': lambda: get_hospital_open_requests(0)[:5],
+    'hospital_group_demand': lambda: BloodRequest.objects.filter(
+        hospital=0, blood_group='O+', created_at__gte=timezone.now() - timedelta(days=30)
+    ),
+    'group_request_counts': lambda: BloodRequest.objects.filter(
+        created_at__gte=timezone.now() - timedelta(days=30)
+    ).values_list('blood_group').annotate(total=Count('id')),
+    'batch_match_requests': lambda: BloodRequest.objects.filter(is_active=True).order_by('id'),
+    'hospital_pending_donations': lambda: Donation.objects.filter(hospital=0, status=Donation.DonationStatus.PENDING),
+}
+
+def find_sequential_scans(plan, vendor):
+    """Table names a query plan reads with a full (non-index) scan"""
+    tables = []
+    for line in plan.splitlines():
+        line = line.strip()
+        if vendor == 'postgresql' and 'Seq Scan on ' in line:
+            tables.append(line.split('Seq Scan on ', 1)[1].split()[0])
+        elif vendor == 'sqlite' and ' SCAN ' in f' {line} ' and ' USING ' not in line:
+            # "SCAN core_bloodrequest" (or "SCAN TABLE core_bloodrequest" on older SQLite)
+            words = line.split('SCAN ', 1)[1].split()
+            tables.append(words[1] if words[0] == 'TABLE' and len(words) > 1 else words[0])
+    return tables
+
+def estimate_table_rows(table):
+    """Approximate row count of a table (planner statistics where available)"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table])
+            row = cursor.fetchone()
+            return max(row[0], 0) if row else 0
+        cursor.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(table)}")
+        return cursor.fetchone()[0]
+
+def check_hot_query_plans(min_rows=10000):
+    """
+    EXPLAIN every HOT_QUERIES entry.
+    Returns {query name: (plan, [large tables scanned sequentially])}.
+    """
+    results = {}
+    for name, build_query in HOT_QUERIES.items():
+        plan = build_query().explain()
+        scanned = [
+            table for table in find_sequential_scans(plan, connection.vendor)
+            if estimate_table_rows(table) >= min_rows
+        ]
+        results[name] = (plan, scanned)
+    return results
@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import BloodRequest, CustomUser, Donation, HospitalAnalytics
+
+
+class HospitalCountersTests(TestCase):
+    """HospitalAnalytics counters stay equal to a recount when the row is created lazily"""
+
+    def setUp(self):
+        # Created as admins, then given their role: skips the profile receivers, registered twice
+        self.hospital = self.create_user('hospital', CustomUser.Role.HOSPITAL)
+        self.donor = self.create_user('donor', CustomUser.Role.DONOR)
+        # A request from before the hospital had an analytics row
+        self.create_request()
+        HospitalAnalytics.objects.filter(hospital=self.hospital).delete()
+
+    def create_user(self, username, role):
+        user = CustomUser.objects.create_user(
+            email=f'{username}@example.com', password='x', username=username, role=CustomUser.Role.ADMIN
+        )
+        CustomUser.objects.filter(pk=user.pk).update(role=role)
+        return user
+
+    def create_request(self):
+        return BloodRequest.objects.create(
+            hospital=self.hospital, patient_name='Patient', patient_age=40, blood_group='O+',
+            family_member_name='Family', contact_number='9999999999', address='Address',
+            expires_on=timezone.now() + timedelta(days=2),
+        )
+
+    def assertCountersMatch(self):
+        row = HospitalAnalytics.objects.get(hospital=self.hospital)
+        self.assertEqual(
+            {field: getattr(row, field) for field in HospitalAnalytics.COUNTER_FIELDS},
+            HospitalAnalytics.count_counters(self.hospital.id),
+        )
+
+    def test_request_save_and_close(self):
+        request = self.create_request()
+        self.assertCountersMatch()
+
+        request.is_active = False
+        request.status = 'Fulfilled'
+        request.save()
+        self.assertCountersMatch()
+
+    def test_donation_save_and_confirm(self):
+        donation = Donation.objects.create(
+            donor=self.donor, hospital=self.hospital, hospital_name='Hospital', location='City',
+            donation_date=timezone.localdate(),
+        )
+        self.assertCountersMatch()
+
+        donation.status = Donation.DonationStatus.CONFIRMED
+        donation.units = 2
+        donation.save()
+        self.assertCountersMatch()
@@ -32,6 +32,7 @@ from .views import (
     # 5. Hospital-Specific Views
     HospitalDashboardView,
     BloodRequestCreateView,
+    NotificationJobStatusView,
     BloodCampCreateView,
     ManageRequestsView,
     BloodStockView,
@@ -44,10 +45,13 @@ from .views import (
     AIDonorMatchingView,
     BloodDemandPredictionView,
     DonorRetentionAnalyticsView,
+    DonorRetentionListView,
     AnalyticsDataView,
 
     # 7. API Views
     confirm_donation,
+    NotificationInboxView,
+    NotificationMarkReadView,
 )
 
 app_name = 'core'
@@ -73,6 +77,8 @@ urlpatterns = [
     # 3. Central Dashboard Redirector
     # ==========================================
     path('dashboard/', DashboardRedirectView.as_view(), name='dashboard_redirect'),
+    path('notifications/', NotificationInboxView.as_view(), name='notification_inbox'),
+    path('notifications/mark-read/', NotificationMarkReadView.as_view(), name='notification_mark_read'),
     
     # ==========================================
     # 4. Donor-Specific URLs
@@ -90,6 +96,7 @@ urlpatterns = [
     # ==========================================
     path('hospital/dashboard/', HospitalDashboardView.as_view(), name='hospital_dashboard'),
     path('hospital/request/create/', BloodRequestCreateView.as_view(), name='create_request'),
+    path('hospital/request/<int:request_id>/notification-status/', NotificationJobStatusView.as_view(), name='notification_job_status'),
     path('hospital/camp/create/', BloodCampCreateView.as_view(), name='create_camp'),
     path('hospital/requests/manage/', ManageRequestsView.as_view(), name='manage_requests'),  # ✅ YEH LINE CHECK KARO
     path('hospital/stock/', BloodStockView.as_view(), name='blood_stock'),
@@ -106,6 +113,7 @@ urlpatterns = [
     path('hospital/ai/matching/<int:request_id>/', AIDonorMatchingView.as_view(), name='ai_donor_matching_detail'),
     path('hospital/ai/demand-prediction/', BloodDemandPredictionView.as_view(), name='blood_demand_prediction'),
     path('hospital/ai/donor-retention/', DonorRetentionAnalyticsView.as_view(), name='donor_retention_analytics'),
+    path('hospital/ai/donor-retention/donors/', DonorRetentionListView.as_view(), name='donor_retention_list'),
     path('matching/', views.AIDonorMatchingView.as_view(), name='ai_donor_matching'),
 
     # ✅ Analytics Data API - YEH USE KAR RAHA HAI JAVASCRIPT
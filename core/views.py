@@ -9,7 +9,7 @@ from django.contrib import messages
 from django.utils import timezone
 from django.db.models import Count, Sum, Q, Avg
 import numpy as np
-from datetime import timedelta
+from datetime import datetime, timedelta
 from django.db import models
 from django.http import JsonResponse
 import json
@@ -21,16 +21,18 @@ from django.conf import settings
 from .models import (
     CustomUser, UserProfile, HospitalProfile,
     Donation, Badge, UserBadge, Certificate,
-    BloodRequest, BloodCamp, ContactMessage, Notification, AIPredictionLog, PasswordResetToken,
+    BloodRequest, BloodCamp, ContactMessage, Notification, NotificationJob, AIPredictionLog, PasswordResetToken,
     BloodStock, GlobalSetting, DonorAnalytics, HospitalAnalytics, ChatbotConversation
 )
 from .forms import (
     UserRegistrationForm, HospitalRegistrationForm, CustomLoginForm,
     UserProfileUpdateForm, HospitalProfileUpdateForm, CustomPasswordChangeForm, NotificationSettingsForm,
     ContactForm, BloodRequestForm, BloodCampForm, DonationResponseForm, PasswordResetRequestForm, PasswordResetConfirmForm,
+    AnalyticsFilterForm,
 )
 # Import the services file
 from . import services
+from .log_buffer import log_writer
 
 # ============================================================================ #
 # 1. PERMISSION MIXINS
@@ -219,15 +221,9 @@ class DonorDashboardView(DonorRequiredMixin, TemplateView):
         context = super().get_context_data(**kwargs)
         user = self.request.user
         
-        # Update analytics
-        services.update_donor_analytics(user)
-        
+        # Analytics are refreshed write-behind (refresh_dirty_analytics), so this GET stays read-only
         donations = Donation.objects.filter(donor=user).order_by('-donation_date')
-        active_requests = BloodRequest.objects.filter(
-            blood_group=user.userprofile.blood_group, 
-            is_active=True, 
-            expires_on__gt=timezone.now()
-        ).order_by('urgency','-created_at')[:5]
+        active_requests = services.get_open_requests_for_group(user.userprofile.blood_group)[:5]
         
         last_donation = donations.first()
         next_eligible_date = services.predict_next_eligible_date(user)
@@ -270,9 +266,6 @@ class DonorProfileView(DonorRequiredMixin, View):
             user.last_name = form.cleaned_data.get('last_name')
             user.save()
             
-            # Update analytics after profile update
-            services.update_donor_analytics(user)
-            
             messages.success(request, 'Profile updated successfully!')
             return redirect('core:donor_profile')
         
@@ -358,11 +351,7 @@ class NearbyRequestsView(DonorRequiredMixin, ListView):
     
     def get_queryset(self):
         user_profile = self.request.user.userprofile
-        return BloodRequest.objects.filter(
-            is_active=True, 
-            blood_group=user_profile.blood_group, 
-            expires_on__gt=timezone.now()
-        ).order_by('urgency', '-created_at')
+        return services.get_open_requests_for_group(user_profile.blood_group)
 
 class RespondToRequestView(DonorRequiredMixin, View):
     def post(self, request, *args, **kwargs):
@@ -448,6 +437,7 @@ class RespondToRequestView(DonorRequiredMixin, View):
             # Create donation record - ONLY WITH FIELDS THAT EXIST IN MODEL
             donation = Donation.objects.create(
                 donor=donor,
+                hospital=blood_request.hospital,
                 hospital_name=blood_request.hospital.hospitalprofile.hospital_name,
                 location=blood_request.hospital.hospitalprofile.city,
                 donation_date=timezone.now().date(),
@@ -468,9 +458,6 @@ class RespondToRequestView(DonorRequiredMixin, View):
                 notification_type=Notification.NotificationType.REQUEST_UPDATE
             )
             
-            # Update analytics
-            services.update_donor_analytics(donor)
-            
             return JsonResponse({
                 'status': 'success', 
                 'message': 'Your response has been sent to the hospital! They will contact you soon.'
@@ -494,26 +481,16 @@ class HospitalDashboardView(HospitalRequiredMixin, View):
     def get(self, request, *args, **kwargs):
         hospital = request.user
         
-        # Update analytics
-        services.update_hospital_analytics(hospital)
-        
+        # Analytics are refreshed write-behind (refresh_dirty_analytics), so this GET stays read-only
         # Blood requests for this hospital
-        recent_active_requests = BloodRequest.objects.filter(
-            hospital=hospital,
-            is_active=True
-        ).order_by('-created_at')[:5]
+        recent_active_requests = services.get_hospital_open_requests(hospital)[:5]
 
-        # Stats
-        total_requests = BloodRequest.objects.filter(hospital=hospital).count()
-        active_requests_count = BloodRequest.objects.filter(hospital=hospital, is_active=True).count()
-        completed_requests_count = Donation.objects.filter(
-            hospital_name=hospital.hospitalprofile.hospital_name,
-            status=Donation.DonationStatus.CONFIRMED
-        ).count()
+        # Stats: one read of the counter cache maintained by request/donation saves
+        analytics = HospitalAnalytics.objects.filter(hospital=hospital).first()
 
         # Pending donations from donors
         pending_donations = Donation.objects.filter(
-            hospital_name=hospital.hospitalprofile.hospital_name,
+            hospital=hospital,
             status=Donation.DonationStatus.PENDING
         )
 
@@ -525,12 +502,14 @@ class HospitalDashboardView(HospitalRequiredMixin, View):
 
         context = {
             'recent_active_requests': recent_active_requests,
-            'total_requests': total_requests,
-            'active_requests_count': active_requests_count,
-            'completed_requests_count': completed_requests_count,
+            'total_requests': analytics.total_requests if analytics else 0,
+            'active_requests_count': analytics.active_requests if analytics else 0,
+            'completed_requests_count': analytics.confirmed_donations if analytics else 0,
+            'confirmed_units': analytics.confirmed_units if analytics else 0,
+            'pending_donations_count': analytics.pending_donations if analytics else 0,
             'pending_donations': pending_donations,
             'low_stock_alerts': low_stock,
-            'analytics': hospital.hospital_analytics if hasattr(hospital, 'hospital_analytics') else None
+            'analytics': analytics
         }
         return render(request, 'core/hospital_dashboard.html', context)
 
@@ -544,31 +523,40 @@ class BloodRequestCreateView(HospitalRequiredMixin, CreateView):
         form.instance.hospital = self.request.user
         blood_request = form.save()
         
-        # Update hospital analytics
-        services.update_hospital_analytics(self.request.user)
-        
         messages.success(self.request, "Blood request created successfully.")
         
-        # Find and notify matching donors
-        matching_donors = services.find_matching_donors(blood_request)
-        notification_message = f"New {blood_request.urgency} request for {blood_request.blood_group} blood at {blood_request.hospital.hospitalprofile.hospital_name}."
-        
-        notifications_to_create = [
-            Notification(
-                recipient=donor, 
-                message=notification_message, 
-                notification_type=Notification.NotificationType.BLOOD_REQUEST
-            ) for donor in matching_donors
-        ]
-        
-        if notifications_to_create:
-            Notification.objects.bulk_create(notifications_to_create)
-            messages.info(self.request, f"Notified {len(notifications_to_create)} matching donors.")
-        else:
-            messages.warning(self.request, "No matching donors found in your area.")
+        # Match and notify donors off the request path (run_notification_worker)
+        services.enqueue_notification_job(blood_request)
+        messages.info(self.request, "Matching donors are being notified in the background.")
         
         return redirect(self.get_success_url())
 
+class NotificationJobStatusView(HospitalRequiredMixin, View):
+    """JSON progress of the latest match-and-notify job of one of the hospital's requests"""
+    def get(self, request, request_id):
+        blood_request = get_object_or_404(BloodRequest, id=request_id, hospital=request.user)
+        job = blood_request.notification_jobs.order_by('-id').first()
+        if job is None:
+            return JsonResponse({'error': 'No notification job for this request'}, status=404)
+        
+        # Critical requests notify in waves; report the latest wave and the running total
+        total_notified = blood_request.notification_jobs.aggregate(total=Sum('donors_notified'))['total']
+        
+        return JsonResponse({
+            'request_id': blood_request.id,
+            'job_id': job.id,
+            'wave': job.wave,
+            'status': job.status,
+            'done': job.status in (NotificationJob.Status.DONE, NotificationJob.Status.FAILED),
+            'attempts': job.attempts,
+            'donors_matched': job.donors_matched,
+            'donors_notified': job.donors_notified,
+            'total_donors_notified': total_notified,
+            'error': job.error or None,
+            'created_at': job.created_at.isoformat(),
+            'finished_at': job.finished_at.isoformat() if job.finished_at else None
+        })
+
 class BloodCampCreateView(HospitalRequiredMixin, CreateView):
     model = BloodCamp
     form_class = BloodCampForm
@@ -670,7 +658,7 @@ class UpdateDonationStatusView(HospitalRequiredMixin, View):
     Allows hospital to confirm or reject a donor's donation response.
     """
     def post(self, request, donation_id, *args, **kwargs):
-        donation = get_object_or_404(Donation, id=donation_id)
+        donation = get_object_or_404(Donation, id=donation_id, hospital=request.user)
         
         action = request.POST.get('action')
         if action == 'confirm':
@@ -697,10 +685,6 @@ class UpdateDonationStatusView(HospitalRequiredMixin, View):
         else:
             return JsonResponse({'status': 'error', 'message': 'Invalid action'}, status=400)
         
-        # Update analytics
-        services.update_hospital_analytics(request.user)
-        services.update_donor_analytics(donation.donor)
-        
         return JsonResponse({'status': 'success', 'message': message})
 
 # ============================================================================ #
@@ -950,7 +934,7 @@ class AnalyticsDataView(HospitalRequiredMixin, View):
     
     def get(self, request, request_id, *args, **kwargs):
         blood_request = get_object_or_404(BloodRequest, id=request_id, hospital=request.user)
-        matching_results = services.advanced_donor_matching(blood_request)
+        matching_results = services.get_cached_donor_matches(blood_request)
         
         context = {
             'blood_request': blood_request,
@@ -967,12 +951,13 @@ class BloodDemandPredictionView(HospitalRequiredMixin, TemplateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        predictions = services.predict_blood_demand_advanced(self.request.user)
+        forecast = services.get_cached_demand_forecast(self.request.user)
         
         context.update({
-            'predictions': predictions,
+            'predictions': forecast['predictions'],
             'prediction_days': 7,
-            'last_updated': timezone.now()
+            'computed_at': forecast['computed_at'],
+            'last_updated': forecast['computed_at']
         })
         
         return context
@@ -983,7 +968,7 @@ class DonorRetentionAnalyticsView(HospitalRequiredMixin, TemplateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        retention_data = services.analyze_donor_retention_risk(self.request.user)
+        retention_data = services.get_materialized_retention_risk(limit=10)
         
         context.update({
             'retention_data': retention_data,
@@ -993,6 +978,67 @@ class DonorRetentionAnalyticsView(HospitalRequiredMixin, TemplateView):
         
         return context
 
+def serialize_retention_entry(entry):
+    """JSON-safe donor row for the retention dashboards"""
+    donor = entry['donor']
+    profile = donor.userprofile
+    analytics = getattr(donor, 'analytics', None)
+    last_donation_date = analytics.last_donation_date if analytics else None
+    
+    return {
+        'donor_id': donor.id,
+        'name': donor.get_full_name() or donor.username,
+        'blood_group': profile.blood_group or '',
+        'city': profile.city or '',
+        'profile_photo': profile.profile_photo.url if profile.profile_photo else '/static/images/default-avatar.png',
+        'last_donation': last_donation_date.strftime('%Y-%m-%d') if last_donation_date else None,
+        'analysis': entry['analysis']
+    }
+
+class DonorRetentionListView(HospitalRequiredMixin, View):
+    """
+    Keyset-paginated JSON list of donors by stored retention risk.
+    Query params: cursor, page_size (max 100), risk_level, blood_group, city.
+    """
+    MAX_PAGE_SIZE = 100
+    
+    def get(self, request):
+        try:
+            cursor = self.decode_cursor(request.GET.get('cursor'))
+            page_size = min(self.MAX_PAGE_SIZE, max(1, int(request.GET.get('page_size', 50))))
+        except ValueError:
+            return JsonResponse({'error': 'Invalid cursor or page_size'}, status=400)
+        
+        risk_level = request.GET.get('risk_level', '').capitalize() or None
+        if risk_level and risk_level not in services.RETENTION_RISK_BUCKETS:
+            return JsonResponse({'error': 'risk_level must be High, Medium or Low'}, status=400)
+        
+        entries, next_cursor = services.get_retention_risk_page(
+            cursor=cursor,
+            page_size=page_size,
+            risk_level=risk_level,
+            blood_group=request.GET.get('blood_group') or None,
+            city=request.GET.get('city') or None
+        )
+        
+        return JsonResponse({
+            'results': [serialize_retention_entry(entry) for entry in entries],
+            'next_cursor': self.encode_cursor(next_cursor),
+            'has_more': next_cursor is not None
+        })
+    
+    @staticmethod
+    def encode_cursor(cursor):
+        """'<risk score>:<donor id>' of the last row, or None"""
+        return f"{cursor[0]}:{cursor[1]}" if cursor else None
+    
+    @staticmethod
+    def decode_cursor(value):
+        if not value:
+            return None
+        score, _, donor_id = value.partition(':')
+        return float(score), int(donor_id)
+
 # ============================================================================ #
 # 8. ENHANCED CHATBOT VIEW WITH GEMINI AI
 # ============================================================================ #
@@ -1049,14 +1095,14 @@ class ChatbotView(View):
             # Store conversation
             if request.user.is_authenticated:
                 try:
-                    ChatbotConversation.objects.create(
+                    log_writer.add(ChatbotConversation(
                         user=request.user,
                         session_id=request.session.session_key or 'anonymous',
                         user_message=user_message,
                         bot_response=response['answer'],
                         confidence_score=0.8
-                    )
-                    print("✅ Conversation saved to database")
+                    ))
+                    print("✅ Conversation queued for saving")
                 except Exception as e:
                     print(f"❌ Failed to save conversation: {e}")
             
@@ -1553,9 +1599,9 @@ What would you like to know?"""
     def log_chatbot_interaction(self, user, user_message, ai_response):
         """Log chatbot interactions for analytics"""
         try:
-            AIPredictionLog.objects.create(
+            services.log_ai_prediction(
                 prediction_type=AIPredictionLog.PredictionType.ELIGIBILITY_PREDICTION,
-                target_user=user if user.is_authenticated else None,
+                user=user if user.is_authenticated else None,
                 input_data={
                     'user_message': user_message,
                     'user_authenticated': user.is_authenticated,
@@ -1566,10 +1612,9 @@ What would you like to know?"""
                     'ai_response': ai_response,
                     'response_length': len(ai_response),
                     'response_preview': ai_response[:100]
-                },
-                confidence_score=0.8
+                }
             )
-            print("✅ Chatbot interaction logged successfully")
+            print("✅ Chatbot interaction queued for logging")
         except Exception as e:
             print(f"❌ Failed to log chatbot interaction: {e}")
 
@@ -1611,6 +1656,12 @@ class AnalyticsDataView(View):
                 data = self.get_matching_data(hospital, request_id)
             elif data_type == 'active_requests':
                 data = self.get_active_requests(hospital)
+            elif data_type == 'demand_summary':
+                # date_range defaults to the form's initial 30 days
+                form = AnalyticsFilterForm({'date_range': '30', **request.GET.dict()})
+                if not form.is_valid():
+                    return JsonResponse({'error': form.errors}, status=400)
+                data = self.get_demand_summary_data(hospital, form)
             else:
                 data = {'error': 'Invalid data type'}
             
@@ -1633,19 +1684,19 @@ class AnalyticsDataView(View):
         demand_predictions = {}
         blood_groups = UserProfile.BloodGroup.choices
         
+        # Last 30 days of demand per blood group, read from the daily rollup
+        today = timezone.localdate()
+        recent_demand = services.get_demand_summary(hospital, today - timedelta(days=30), today)
+        
         for bg_code, bg_name in blood_groups:
             if not bg_code:  # Skip empty blood groups
                 continue            
             try:
                 # Get actual blood requests for this blood group
-                recent_requests = BloodRequest.objects.filter(
-                    hospital=hospital,
-                    blood_group=bg_code,
-                    created_at__gte=timezone.now() - timedelta(days=30)
-                )
+                recent_requests = recent_demand.get(bg_code)
                 
                 # If no recent requests, use realistic defaults
-                if not recent_requests.exists():
+                if not recent_requests:
                     # Realistic default demands based on blood group prevalence
                     default_demands = {
                         'A+': 12, 'A-': 4, 'B+': 8, 'B-': 2,
@@ -1655,10 +1706,8 @@ class AnalyticsDataView(View):
                     data_points = 0
                     confidence = 0.6  # Medium confidence for defaults
                 else:
-                    avg_demand = recent_requests.aggregate(
-                        avg_demand=Avg('units_required')
-                    )['avg_demand'] or 0
-                    data_points = recent_requests.count()
+                    avg_demand = recent_requests['avg_units']
+                    data_points = recent_requests['requests']
                     confidence = min(0.95, 0.3 + (data_points * 0.1))  # More data = more confidence
                 
                 # Get current stock
@@ -2027,8 +2076,9 @@ class AnalyticsDataView(View):
         return self.get_overview_data(hospital)  # Reuse overview data for now
     
     def get_retention_data(self, hospital):
-        """REAL donor retention data"""
-        overview_data = self.get_overview_data(hospital)
+        """REAL donor retention data (top risks from the nightly DonorAnalytics scores)"""
+        retention_data = services.get_materialized_retention_risk(limit=10)
+        summary_stats = retention_data['summary_stats']
         
         # Add risk factors analysis
         risk_factors = [
@@ -2036,20 +2086,32 @@ class AnalyticsDataView(View):
                 'name': 'Long-term Inactivity',
                 'description': 'Donors who haven\'t donated in over 6 months',
                 'severity': 'high',
-                'affected_count': overview_data['retention_data']['summary_stats']['high_risk_count'],
+                'affected_count': summary_stats['high_risk_count'],
                 'impact': 75
             },
             {
                 'name': 'Low Engagement', 
                 'description': 'Donors with low platform engagement scores',
                 'severity': 'medium',
-                'affected_count': overview_data['retention_data']['summary_stats']['medium_risk_count'],
+                'affected_count': summary_stats['medium_risk_count'],
                 'impact': 60
             }
         ]
         
-        overview_data['retention_data']['risk_factors'] = risk_factors
-        return overview_data['retention_data']
+        return {
+            'high_risk': [serialize_retention_entry(entry) for entry in retention_data['high_risk'][:10]],
+            'summary_stats': summary_stats,
+            'risk_factors': risk_factors
+        }
+    
+    def get_demand_summary_data(self, hospital, form):
+        """Per blood group demand over the filter form's date range (DailyBloodDemand rollup)"""
+        start_date, end_date = form.get_date_range()
+        return {
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'demand': form.get_demand_summary(hospital)
+        }
     
     # Add these functions to your views.py in the AnalyticsDataView class
 
@@ -2285,7 +2347,7 @@ def confirm_donation(request, donation_id):
     donation = get_object_or_404(Donation, id=donation_id)
     
     # Check if donation belongs to this hospital
-    if donation.hospital_name != request.user.hospitalprofile.hospital_name:
+    if donation.hospital_id != request.user.id:
         messages.error(request, "This donation does not belong to your hospital.")
         return redirect('core:hospital_dashboard')
     
@@ -2308,6 +2370,71 @@ def confirm_donation(request, donation_id):
     
     return redirect('core:hospital_dashboard')
 
+def serialize_notification(notification):
+    return {
+        'id': notification.id,
+        'message': notification.message,
+        'notification_type': notification.notification_type,
+        'is_read': notification.is_read,
+        'created_at': notification.created_at.isoformat(),
+        'related_object_id': notification.related_object_id,
+        'related_content_type': notification.related_content_type
+    }
+
+class NotificationInboxView(LoginRequiredMixin, View):
+    """
+    Keyset-paginated JSON inbox of the logged-in user's notifications.
+    Query params: cursor, page_size (max 100), unread (1 for unread only).
+    """
+    MAX_PAGE_SIZE = 100
+    
+    def get(self, request):
+        try:
+            cursor = self.decode_cursor(request.GET.get('cursor'))
+            page_size = min(self.MAX_PAGE_SIZE, max(1, int(request.GET.get('page_size', 20))))
+        except ValueError:
+            return JsonResponse({'error': 'Invalid cursor or page_size'}, status=400)
+        
+        notifications, next_cursor = services.get_notification_page(
+            request.user, cursor=cursor, page_size=page_size,
+            unread_only=request.GET.get('unread') in ('1', 'true')
+        )
+        
+        return JsonResponse({
+            'results': [serialize_notification(notification) for notification in notifications],
+            'next_cursor': self.encode_cursor(next_cursor),
+            'has_more': next_cursor is not None,
+            'unread_count': request.user.unread_notification_count
+        })
+    
+    CURSOR_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.get_fixed_timezone(0))
+    
+    @classmethod
+    def encode_cursor(cls, cursor):
+        """Opaque, URL-safe '<created_at epoch microseconds>_<notification id>' of the last row, or None"""
+        if not cursor:
+            return None
+        return f"{(cursor[0] - cls.CURSOR_EPOCH) // timedelta(microseconds=1)}_{cursor[1]}"
+    
+    @classmethod
+    def decode_cursor(cls, value):
+        if not value:
+            return None
+        micros, _, notification_id = value.partition('_')
+        return cls.CURSOR_EPOCH + timedelta(microseconds=int(micros)), int(notification_id)
+
+class NotificationMarkReadView(LoginRequiredMixin, View):
+    """Mark notifications read: JSON body {"ids": [...]} or {"all": true}"""
+    def post(self, request):
+        try:
+            data = json.loads(request.body or '{}')
+            ids = None if data.get('all') else [int(notification_id) for notification_id in data.get('ids', [])]
+        except (ValueError, TypeError, AttributeError):
+            return JsonResponse({'error': 'Expected {"ids": [...]} or {"all": true}'}, status=400)
+        
+        marked, unread = services.mark_notifications_read(request.user, ids)
+        return JsonResponse({'marked': marked, 'unread_count': unread})
+
 import json
 from django.http import JsonResponse
 
@@ -2361,10 +2488,7 @@ class AIDonorMatchingView(HospitalRequiredMixin, View):
     def get(self, request, request_id=None, *args, **kwargs):
         if request_id is None:
             # Get the latest active request
-            latest_request = BloodRequest.objects.filter(
-                hospital=request.user,
-                is_active=True
-            ).order_by('-created_at').first()
+            latest_request = services.get_hospital_open_requests(request.user).first()
             
             if latest_request:
                 return redirect('core:ai_donor_matching', request_id=latest_request.id)
@@ -2373,17 +2497,14 @@ class AIDonorMatchingView(HospitalRequiredMixin, View):
                 return redirect('core:blood_request_create')
         
         blood_request = get_object_or_404(BloodRequest, id=request_id, hospital=request.user)
-        matching_results = services.advanced_donor_matching(blood_request)
+        matching_results = services.get_cached_donor_matches(blood_request)
         
         context = {
             'blood_request': blood_request,
             'matching_results': matching_results,
             'total_matches': len(matching_results),
             'top_matches': matching_results[:10],
-            'active_requests': BloodRequest.objects.filter(
-                hospital=request.user, 
-                is_active=True
-            ).order_by('-created_at')
+            'active_requests': services.get_hospital_open_requests(request.user)
         }
         
         return render(request, self.template_name, context)
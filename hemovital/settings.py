@@ -5,7 +5,7 @@ Django settings for hemovital project.
 import os
 from pathlib import Path
 from django.contrib.messages import constants as messages
-from decouple import config  # Add this import
+from decouple import config, Csv  # Add this import
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -58,6 +58,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.global_settings',
+                'core.context_processors.notification_counts',
             ],
         },
     },
@@ -171,6 +172,32 @@ HEMOVITAL_SETTINGS = {
     'MIN_DONOR_WEIGHT': config('MIN_DONOR_WEIGHT', default=50, cast=int),
     'AI_PREDICTION_ENABLED': config('AI_PREDICTION_ENABLED', default=True, cast=bool),
     'CHATBOT_ENABLED': config('CHATBOT_ENABLED', default=True, cast=bool),
+    'FORECAST_WORKERS': config('FORECAST_WORKERS', default=0, cast=int),  # 0 = one per CPU
+    'FORECAST_CACHE_TTL': config('FORECAST_CACHE_TTL', default=3600, cast=int),  # seconds
+    'MATCH_CACHE_TTL': config('MATCH_CACHE_TTL', default=900, cast=int),  # seconds
+    'GLOBAL_SETTING_RECHECK_INTERVAL': config('GLOBAL_SETTING_RECHECK_INTERVAL', default=5.0, cast=float),  # seconds a worker trusts its cached GlobalSetting
+    'NOTIFICATION_JOB_MAX_ATTEMPTS': config('NOTIFICATION_JOB_MAX_ATTEMPTS', default=3, cast=int),
+    'NOTIFICATION_JOB_TIMEOUT': config('NOTIFICATION_JOB_TIMEOUT', default=300, cast=int),  # seconds before a RUNNING job is retried
+    'NOTIFICATION_JOB_RETRY_DELAY': config('NOTIFICATION_JOB_RETRY_DELAY', default=30, cast=int),  # seconds before the first retry, doubled per attempt
+    'CRITICAL_WAVES': config('CRITICAL_WAVES', default=4, cast=int),  # wave n searches (n + 1) x the default radius
+    'CRITICAL_WAVE_SIZE': config('CRITICAL_WAVE_SIZE', default=10, cast=int),  # donors in the first wave, doubled each wave
+    'CRITICAL_WAVE_INTERVAL': config('CRITICAL_WAVE_INTERVAL', default=600, cast=int),  # seconds between waves
+    # Data retention (archive_old_records): days kept before rows are archived and deleted
+    'NOTIFICATION_RETENTION_DAYS': config('NOTIFICATION_RETENTION_DAYS', default=180, cast=int),
+    'PREDICTION_LOG_RETENTION_DAYS': config('PREDICTION_LOG_RETENTION_DAYS', default=90, cast=int),
+    'CHATBOT_RETENTION_DAYS': config('CHATBOT_RETENTION_DAYS', default=365, cast=int),
+    'ARCHIVE_DIR': config('ARCHIVE_DIR', default=str(BASE_DIR / 'archive')),
+    # Buffered AIPredictionLog/ChatbotConversation writes (0 = write each row immediately)
+    'PREDICTION_LOG_BUFFER_SIZE': config('PREDICTION_LOG_BUFFER_SIZE', default=100, cast=int),
+    'PREDICTION_LOG_FLUSH_INTERVAL': config('PREDICTION_LOG_FLUSH_INTERVAL', default=5.0, cast=float),  # seconds
+    'ANALYTICS_REFRESH_INTERVAL': config('ANALYTICS_REFRESH_INTERVAL', default=300, cast=int),  # seconds between recomputes per user
+    # Fraction of predictions logged per type, e.g. "DONOR_MATCH=0.1,ELIGIBILITY_PREDICTION=0.25" (default 1)
+    'PREDICTION_LOG_SAMPLE_RATES': {
+        prediction_type.strip(): float(rate)
+        for prediction_type, _, rate in (
+            item.partition('=') for item in config('PREDICTION_LOG_SAMPLE_RATES', default='', cast=Csv())
+        )
+    },
 }
 
 # Security Settings
@@ -221,10 +248,16 @@ LOGGING = {
 }
 
 # Cache Configuration
+# Shared by every gunicorn worker and the background commands, so cache
+# versions, match pools and forecasts invalidated in one process are seen by
+# all. The table is created by migration (core 0021).
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'hemovital_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=100000, cast=int),
+        },
     }
 }
 